@@ -693,19 +693,26 @@ def display_update_section(data_manager, change_detector, history_manager, watch
                 with st.spinner("Détection des changements..."):
                     logger.info("ÉTAPE 5: Détection des changements")
                     
-                    # Charger les nouvelles listes à partir des fichiers sources
-                    new_lists = data_manager.load_all_lists()
-                    logger.info(f"Nouvelles listes chargées: {list(new_lists.keys())}")
-
                     # Préparer le dictionnaire des anciennes listes. Il sera vide lors du premier chargement.
                     old_lists = {}
                     if not old_aggregated.empty:
                         for list_name in old_aggregated['source_list'].unique():
                             old_lists[list_name] = old_aggregated[old_aggregated['source_list'] == list_name]
-                    
-                    logger.info("ÉTAPE 6: Détection des changements pour toutes les listes")
-                    changes_df = change_detector.detect_all_changes(old_lists, new_lists)
-                    logger.info(f"Changements détectés: {len(changes_df)} enregistrements")
+
+                    if data_manager.is_reused_aggregate(aggregated_df):
+                        # Fichiers sources inchangés depuis la dernière agrégation : rien à détecter,
+                        # les classeurs ne sont pas relus (récapitulatif sans changement)
+                        logger.info("Fichiers sources inchangés, détection des changements ignorée")
+                        new_lists = {}
+                        changes_df = pd.DataFrame()
+                    else:
+                        # Charger les nouvelles listes à partir des fichiers sources
+                        new_lists = data_manager.load_all_lists()
+                        logger.info(f"Nouvelles listes chargées: {list(new_lists.keys())}")
+
+                        logger.info("ÉTAPE 6: Détection des changements pour toutes les listes")
+                        changes_df = change_detector.detect_all_changes(old_lists, new_lists)
+                        logger.info(f"Changements détectés: {len(changes_df)} enregistrements")
 
                     # Créer le tableau récapitulatif par liste source
                     st.subheader("📋 Récapitulatif des Changements par Liste")
@@ -1133,14 +1140,22 @@ def display_watchlist_surveillance(watchlist_manager, risk_analyzer, alert_syste
 
                     # Ajouter les prédictions et anomalies
                     predictions = []
-                    anomalies = []
 
-                    for cas_id in scores_df['cas_id']:
-                        pred = risk_analyzer.predict_next_change(cas_id, history_df)
-                        anom = risk_analyzer.detect_anomalies(cas_id, history_df)
+                    # Timestamps convertis une seule fois pour toutes les substances
+                    history_dt = history_df
+                    if 'timestamp' in history_df.columns:
+                        history_dt = history_df.assign(timestamp=pd.to_datetime(history_df['timestamp']))
+
+                    # Même date de référence pour toute la liste
+                    now = datetime.now()
+                    with risk_analyzer.frame_cache():
+                        for cas_id in scores_df['cas_id']:
+                            pred = risk_analyzer.predict_next_change(cas_id, history_dt, now=now)
+                            predictions.append(pred.get('prediction', 'N/A'))
 
-                        predictions.append(pred.get('prediction', 'N/A'))
-                        anomalies.append(anom.get('badge', '') if anom.get('has_anomaly') else '')
+                    # Anomalies de toute la liste en une seule passe sur l'historique
+                    anomalies_df = risk_analyzer.detect_anomalies_bulk(list(scores_df['cas_id']), history_dt)
+                    anomalies = anomalies_df['badge'].where(anomalies_df['has_anomaly'], '').tolist()
 
                     scores_df['prediction'] = predictions
                     scores_df['anomalie'] = anomalies
@@ -1445,12 +1460,14 @@ def display_calendar_heatmap(history_manager, data_manager, risk_analyzer):
     st.divider()
     with st.spinner("Génération du calendrier heatmap..."):
         try:
-            fig = risk_analyzer.generate_calendar_heatmap(
-                history_df,
-                year=selected_year,
-                source_list_filter=selected_source if selected_source != "Toutes" else None,
-                change_type_filter=selected_type if selected_type != "Tous" else None
-            )
+            # Empreinte et dates de l'historique calculées une seule fois pour ce rafraîchissement
+            with risk_analyzer.frame_cache():
+                fig = risk_analyzer.generate_calendar_heatmap(
+                    history_df,
+                    year=selected_year,
+                    source_list_filter=selected_source if selected_source != "Toutes" else None,
+                    change_type_filter=selected_type if selected_type != "Tous" else None
+                )
 
             # Afficher le graphique
             st.plotly_chart(fig, use_container_width=True)
@@ -2012,9 +2029,11 @@ def display_risk_heatmap(data_manager, history_manager, risk_analyzer):
 
         # Calculer les scores
         scores = []
-        for _, row in aggregated_df.iterrows():
-            result = risk_analyzer.calculate_risk_score(row['cas_id'], aggregated_df, history_df)
-            scores.append(result['total_score'])
+        now = datetime.now()
+        with risk_analyzer.frame_cache():
+            for _, row in aggregated_df.iterrows():
+                result = risk_analyzer.calculate_risk_score(row['cas_id'], aggregated_df, history_df, now=now)
+                scores.append(result['total_score'])
 
         import numpy as np
         avg_score = np.mean(scores) if scores else 0
@@ -1,9 +1,13 @@
+import logging
 import pandas as pd
+import numpy as np
 import yaml
 from pathlib import Path
 from typing import Dict, List, Tuple
 import os
 import shutil
+import hashlib
+import json
 from datetime import datetime
 from backend.logger import get_logger
 
@@ -14,6 +18,12 @@ class DataManager:
         self.logger.info("Initialisation du DataManager")
         self.config = self._load_config(config_path)
         self.data_folder = Path(self.config['general']['data_folder'])
+        # Index {nom_liste: configuration} pour éviter de parcourir la liste à chaque appel
+        self._list_configs = {l['name']: l for l in self.config['source_files']['lists']}
+        self.aggregate_stamp_file = Path(self.config['output_files']['aggregated_data']).with_suffix('.stamp')
+        # Empreinte des fichiers sources de la dernière agrégation, écrite lors de la sauvegarde
+        self._pending_aggregate_stamp = None
+        self._unchanged_aggregate = None
         self.logger.debug(f"Dossier de donnees: {self.data_folder}")
 
     def _load_config(self, config_path: str) -> dict:
@@ -36,15 +46,20 @@ class DataManager:
 
         # Créer un dictionnaire de renommage inversé
         # config: cas_id: "CAS number" → rename_map: "CAS number": "cas_id"
-        rename_map = {}
-        for normalized_name, excel_name in self.config['columns']['common'].items():
-            if excel_name in df.columns:
-                rename_map[excel_name] = normalized_name
-                self.logger.debug(f"Renommage colonne: '{excel_name}' -> '{normalized_name}'")
-            else:
-                self.logger.warning(f"Colonne '{excel_name}' non trouvee dans le fichier (attendue pour '{normalized_name}')")
-
-        df_renamed = df.rename(columns=rename_map)
+        common_columns = self.config['columns']['common']
+        df_columns = set(df.columns)
+        rename_map = {excel_name: normalized_name
+                      for normalized_name, excel_name in common_columns.items()
+                      if excel_name in df_columns}
+        self.logger.debug("Renommage colonnes: %s", rename_map)
+
+        missing = {normalized_name: excel_name
+                   for normalized_name, excel_name in common_columns.items()
+                   if excel_name not in df_columns}
+        if missing:
+            self.logger.warning("Colonnes non trouvees dans le fichier (attendues pour): %s", missing)
+
+        df_renamed = df.rename(columns=rename_map, copy=False)
         return df_renamed
 
     def _rename_list_specific_columns(self, df: pd.DataFrame, list_name: str) -> pd.DataFrame:
@@ -63,13 +78,13 @@ class DataManager:
             return df
 
         # Créer un dictionnaire de renommage inversé pour cette liste
-        rename_map = {}
-        for normalized_name, excel_name in self.config['columns'][list_name].items():
-            if excel_name in df.columns:
-                rename_map[excel_name] = normalized_name
-                self.logger.debug(f"Renommage colonne specifique {list_name}: '{excel_name}' -> '{normalized_name}'")
+        df_columns = set(df.columns)
+        rename_map = {excel_name: normalized_name
+                      for normalized_name, excel_name in self.config['columns'][list_name].items()
+                      if excel_name in df_columns}
+        self.logger.debug("Renommage colonnes specifiques %s: %s", list_name, rename_map)
 
-        df_renamed = df.rename(columns=rename_map)
+        df_renamed = df.rename(columns=rename_map, copy=False)
         return df_renamed
 
     def _clean_cas_id_column(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -90,6 +105,23 @@ class DataManager:
             df['cas_id'] = df['cas_id'].str.replace(r'\.0$', '', regex=True)
         return df
 
+    def _apply_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Applique les types définis dans la section 'dtypes' de config.yaml
+        (ex: cas_id en string[pyarrow]) pour réduire la mémoire et accélérer
+        les comparaisons et drop_duplicates.
+
+        Args:
+            df: DataFrame avec les noms de colonnes normalisés
+
+        Returns:
+            DataFrame avec les colonnes converties
+        """
+        for column, dtype in self.config.get('dtypes', {}).items():
+            if column in df.columns:
+                df[column] = df[column].astype(dtype)
+        return df
+
     def load_cas_source(self) -> pd.DataFrame:
         file_path = self.data_folder / "input" / self.config['source_files']['cas_source']
         df = pd.read_excel(file_path)
@@ -97,7 +129,7 @@ class DataManager:
         # Renommer les colonnes communes selon la configuration
         df = self._rename_common_columns(df)
 
-        return df
+        return self._apply_dtypes(df)
 
     def _find_file_by_pattern(self, list_config: dict) -> Path:
         """
@@ -182,7 +214,7 @@ class DataManager:
 
     def load_list_file(self, list_name: str) -> pd.DataFrame:
         self.logger.debug(f"Chargement de la liste: {list_name}")
-        list_config = next((l for l in self.config['source_files']['lists'] if l['name'] == list_name), None)
+        list_config = self._list_configs.get(list_name)
         if not list_config:
             self.logger.error(f"Liste {list_name} non trouvee dans la configuration")
             raise ValueError(f"Liste {list_name} non trouvée dans la configuration")
@@ -212,15 +244,16 @@ class DataManager:
 
         # Nettoyer la colonne cas_id pour assurer la cohérence
         df = self._clean_cas_id_column(df)
+        df = self._apply_dtypes(df)
 
         # Créer un identifiant unique : ajouter un index de ligne pour les cas_id manquants/dupliqués
         if 'cas_id' in df.columns:
-            # Compter les doublons et valeurs manquantes AVANT traitement
-            total_rows = len(df)
-            missing_cas = df['cas_id'].isna().sum() + (df['cas_id'] == '-').sum()
-            duplicated_cas = df['cas_id'].duplicated().sum()
-
-            self.logger.debug(f"Liste {list_name} - Lignes: {total_rows}, CAS manquants/'-': {missing_cas}, Doublons CAS: {duplicated_cas}")
+            # Compter les doublons et valeurs manquantes AVANT traitement (uniquement pour le log)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                missing_cas = df['cas_id'].isna().sum() + (df['cas_id'] == '-').sum()
+                duplicated_cas = df['cas_id'].duplicated().sum()
+                self.logger.debug("Liste %s - Lignes: %d, CAS manquants/'-': %d, Doublons CAS: %d",
+                                  list_name, len(df), missing_cas, duplicated_cas)
 
             # Créer un identifiant unique combinant cas_id + index de ligne pour les cas problématiques
             df['_row_id'] = range(len(df))
@@ -306,22 +339,47 @@ class DataManager:
         """
         self.logger.info("Debut de l'agregation de toutes les listes")
         
+        self._pending_aggregate_stamp = None
+        self._unchanged_aggregate = None
+
         # Utiliser les listes préchargées si fournies, sinon charger depuis les fichiers
         if preloaded_lists is not None:
             self.logger.info(f"Utilisation des listes préchargées: {list(preloaded_lists.keys())}")
             all_lists = preloaded_lists
         else:
+            # Aucun fichier source modifié depuis la dernière agrégation sauvegardée :
+            # on réutilise le fichier agrégé au lieu de tout relire
+            stamp = self._compute_sources_stamp()
+            output_path = Path(self.config['output_files']['aggregated_data'])
+            if (stamp is not None and output_path.exists() and self.aggregate_stamp_file.exists()
+                    and self.aggregate_stamp_file.read_text(encoding='utf-8') == stamp):
+                self.logger.info("Fichiers sources inchangés depuis la dernière agrégation, réutilisation du fichier agrégé")
+                self._unchanged_aggregate = self.load_aggregated_data()
+                return self._unchanged_aggregate
+
             self.logger.info("Chargement des listes depuis les fichiers")
             all_lists = self.load_all_lists()
-
-        aggregated_frames = []
-        for list_name, df in all_lists.items():
-            df_copy = df.copy()
-            df_copy['source_list'] = list_name
-            aggregated_frames.append(df_copy)
-            self.logger.debug(f"Liste {list_name} ajoutee: {len(df_copy)} lignes")
-
-        aggregated_df = pd.concat(aggregated_frames, ignore_index=True).reset_index(drop=True)
+            self._pending_aggregate_stamp = stamp
+
+        list_names = list(all_lists.keys())
+        aggregated_frames = list(all_lists.values())
+        list_lengths = [len(df) for df in aggregated_frames]
+        for list_name, length in zip(list_names, list_lengths):
+            self.logger.debug("Liste %s ajoutee: %d lignes", list_name, length)
+
+        # Concaténer sans copier chaque liste, puis ajouter source_list en une seule allocation
+        # (Categorical : un code entier par ligne au lieu d'une chaîne)
+        # source_list est insérée à la place qu'elle occupait quand elle était ajoutée à chaque
+        # liste avant la concaténation : juste après les colonnes de la première liste
+        aggregated_df = pd.concat(aggregated_frames, ignore_index=True, copy=False)
+        source_list = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(list_names)), list_lengths),
+            categories=list_names
+        )
+        if 'source_list' in aggregated_df.columns:
+            aggregated_df['source_list'] = source_list
+        else:
+            aggregated_df.insert(len(aggregated_frames[0].columns), 'source_list', source_list)
 
         # Créer un identifiant unique permanent pour chaque substance
         # Pour les cas_id manquants ou "-", on utilise l'index global
@@ -370,8 +428,9 @@ class DataManager:
             return new_df
 
         # Vérifier les doublons AVANT déduplication
-        duplicates_before = new_df['unique_substance_id'].duplicated().sum()
-        self.logger.info(f"Doublons détectés dans new_df AVANT déduplication: {duplicates_before}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            duplicates_before = new_df['unique_substance_id'].duplicated().sum()
+            self.logger.debug("Doublons détectés dans new_df AVANT déduplication: %d", duplicates_before)
 
         # Éliminer les doublons (garder la dernière occurrence)
         new_df = new_df.drop_duplicates(subset=['unique_substance_id'], keep='last').reset_index(drop=True)
@@ -394,8 +453,9 @@ class DataManager:
                 old_df = old_df.drop(columns=['_temp_id'])
 
             # Vérifier les doublons AVANT déduplication
-            duplicates_before_old = old_df['unique_substance_id'].duplicated().sum()
-            self.logger.info(f"Doublons détectés dans old_df AVANT déduplication: {duplicates_before_old}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                duplicates_before_old = old_df['unique_substance_id'].duplicated().sum()
+                self.logger.debug("Doublons détectés dans old_df AVANT déduplication: %d", duplicates_before_old)
 
             # Éliminer les doublons
             old_df_unique = old_df.drop_duplicates(subset=['unique_substance_id'], keep='last').reset_index(drop=True)
@@ -412,13 +472,12 @@ class DataManager:
                 old_df_unique = old_df_unique.drop_duplicates(subset=['unique_substance_id'], keep='last').reset_index(drop=True)
                 self.logger.info(f"Après 2ème déduplication: {len(old_df_unique)} lignes")
 
-            # Créer un dictionnaire des timestamps existants
-            self.logger.info("Création du dictionnaire des timestamps")
+            # Aligner les anciennes lignes sur les nouvelles via unique_substance_id
+            self.logger.info("Alignement des timestamps existants")
             try:
-                old_timestamps = old_df_unique.set_index('unique_substance_id')[['created_at', 'updated_at']].to_dict('index')
-                self.logger.info(f"Dictionnaire créé avec succès: {len(old_timestamps)} entrées")
+                old_aligned = old_df_unique.set_index('unique_substance_id').reindex(new_df['unique_substance_id'])
             except ValueError as e:
-                self.logger.error(f"ERREUR lors de la création du dictionnaire: {str(e)}")
+                self.logger.error(f"ERREUR lors de l'alignement des timestamps: {str(e)}")
                 # Vérifier à nouveau les doublons
                 final_duplicates = old_df_unique['unique_substance_id'].duplicated().sum()
                 self.logger.error(f"Doublons FINAUX dans old_df_unique: {final_duplicates}")
@@ -427,71 +486,116 @@ class DataManager:
                     self.logger.error(f"Lignes dupliquées:\n{duplicated_rows[['cas_id', 'source_list', 'unique_substance_id']].to_string()}")
                 raise
 
-            # Pour chaque ligne du nouveau DataFrame
-            created_at_list = []
-            updated_at_list = []
-
-            for idx, row in new_df.iterrows():
-                uid = row['unique_substance_id']
-                if uid in old_timestamps:
-                    # Substance existante: conserver created_at, vérifier si mise à jour nécessaire
-                    created_at_list.append(old_timestamps[uid]['created_at'])
-
-                    # Comparer les données (sans les colonnes de métadonnées)
-                    old_row = old_df_unique[old_df_unique['unique_substance_id'] == uid].iloc[0]
-
-                    # Colonnes à comparer (exclure unique_substance_id, created_at, updated_at, source_list)
-                    cols_to_compare = [col for col in new_df.columns
-                                      if col not in ['unique_substance_id', 'created_at', 'updated_at', 'source_list']]
-
-                    data_changed = False
-                    for col in cols_to_compare:
-                        if col in old_row.index:
-                            old_val = old_row[col]
-                            new_val = row[col]
-                            # Gérer les NaN
-                            if pd.isna(old_val) and pd.isna(new_val):
-                                continue
-                            if old_val != new_val:
-                                data_changed = True
-                                break
-
-                    if data_changed:
-                        updated_at_list.append(current_time)
-                    else:
-                        updated_at_list.append(old_timestamps[uid]['updated_at'])
-                else:
-                    # Nouvelle substance
-                    created_at_list.append(current_time)
-                    updated_at_list.append(current_time)
+            existing = new_df['unique_substance_id'].isin(old_df_unique['unique_substance_id']).to_numpy()
+            self.logger.info(f"Substances existantes: {int(existing.sum())}, nouvelles: {int((~existing).sum())}")
 
-            new_df['created_at'] = created_at_list
-            new_df['updated_at'] = updated_at_list
+            # Substance existante: conserver created_at, et updated_at si les données n'ont pas changé
+            # Nouvelle substance ou données modifiées: timestamp courant
+            rows_changed = self._rows_changed(new_df, old_aligned) & existing
+            new_df['created_at'] = np.where(existing, old_aligned['created_at'].to_numpy(dtype=object), current_time)
+            new_df['updated_at'] = np.where(existing & ~rows_changed,
+                                            old_aligned['updated_at'].to_numpy(dtype=object), current_time)
         else:
             # L'ancien fichier n'a pas de timestamps: traiter comme première agrégation
             self.logger.debug("Ancien fichier sans timestamps: creation pour toutes les lignes")
             new_df['created_at'] = current_time
             new_df['updated_at'] = current_time
 
-        self.logger.debug(f"Timestamps mis a jour: {len(new_df)} lignes")
+        self.logger.debug("Timestamps mis a jour: %d lignes", len(new_df))
         return new_df
 
+    def _rows_changed(self, new_df: pd.DataFrame, old_aligned: pd.DataFrame) -> np.ndarray:
+        """
+        Indique, pour chaque ligne de new_df, si ses données diffèrent de l'ancienne ligne
+        correspondante (deux valeurs nulles sont considérées égales).
+
+        Args:
+            new_df: Nouveau DataFrame
+            old_aligned: Anciennes lignes réindexées sur new_df['unique_substance_id']
+
+        Returns:
+            Tableau booléen aligné sur new_df
+        """
+        # Colonnes à comparer (exclure unique_substance_id, created_at, updated_at, source_list)
+        cols_to_compare = [col for col in new_df.columns
+                           if col not in ['unique_substance_id', 'created_at', 'updated_at', 'source_list']
+                           and col in old_aligned.columns]
+
+        changed = np.zeros(len(new_df), dtype=bool)
+
+        for col in cols_to_compare:
+            old_values = old_aligned[col].to_numpy(dtype=object)
+            new_values = new_df[col].to_numpy(dtype=object)
+            old_na = pd.isna(old_values)
+            new_na = pd.isna(new_values)
+
+            # Une seule des deux valeurs est nulle => changement
+            col_changed = old_na != new_na
+            both_present = ~old_na & ~new_na
+            col_changed[both_present] = old_values[both_present] != new_values[both_present]
+            changed |= col_changed
+
+        return changed
+
+    def _compute_sources_stamp(self) -> str:
+        """
+        Calcule une empreinte des fichiers sources activés (chemin + date de modification)
+        et de la configuration.
+
+        Returns:
+            Empreinte hexadécimale, ou None si un fichier source est introuvable
+        """
+        parts = [json.dumps(self.config, sort_keys=True, default=str)]
+        for list_name, list_config in self._list_configs.items():
+            if not list_config.get('enabled', True):
+                continue
+            try:
+                file_path = self._find_file_by_pattern(list_config)
+            except (FileNotFoundError, ValueError):
+                return None
+            parts.append(f"{list_name}:{file_path}:{file_path.stat().st_mtime_ns}")
+
+        return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+    def is_reused_aggregate(self, df: pd.DataFrame) -> bool:
+        """
+        Indique si df est le fichier agrégé repris tel quel par aggregate_all_data
+        (aucun fichier source modifié depuis la dernière agrégation sauvegardée)
+        """
+        return df is not None and df is self._unchanged_aggregate
+
     def save_aggregated_data(self, df: pd.DataFrame, force: bool = False) -> bool:
         output_path = Path(self.config['output_files']['aggregated_data'])
         self.logger.debug(f"Tentative de sauvegarde vers: {output_path}")
 
+        if not force and self.is_reused_aggregate(df):
+            self.logger.info("Donnees reprises du fichier agrege, pas de sauvegarde necessaire")
+            return False
+
         if not force and output_path.exists():
             self.logger.debug("Comparaison avec le fichier existant")
             old_df = pd.read_excel(output_path)
             if self._dataframes_are_equal(old_df, df):
                 self.logger.info("Donnees identiques, pas de sauvegarde necessaire")
+                self._write_aggregate_stamp()
                 return False
 
         output_path.parent.mkdir(parents=True, exist_ok=True)
         df.to_excel(output_path, index=False, engine='openpyxl')
         self.logger.info(f"Fichier sauvegarde avec succes: {output_path}")
+        self._write_aggregate_stamp()
         return True
 
+    def _write_aggregate_stamp(self) -> None:
+        if self._pending_aggregate_stamp is None:
+            # Agrégation à partir de listes préchargées : l'empreinte ne peut pas être garantie
+            if self.aggregate_stamp_file.exists():
+                self.aggregate_stamp_file.unlink()
+            return
+
+        self.aggregate_stamp_file.write_text(self._pending_aggregate_stamp, encoding='utf-8')
+        self._pending_aggregate_stamp = None
+
     def _dataframes_are_equal(self, df1: pd.DataFrame, df2: pd.DataFrame) -> bool:
         if df1.shape != df2.shape:
             return False
@@ -499,17 +603,37 @@ class DataManager:
         if list(df1.columns) != list(df2.columns):
             return False
 
-        df1_sorted = df1.sort_values(by=list(df1.columns)).reset_index(drop=True)
-        df2_sorted = df2.sort_values(by=list(df2.columns)).reset_index(drop=True)
+        # Mêmes types des deux côtés : l'agrégation fraîche a des colonnes string[pyarrow]
+        # et category, le fichier Excel relu des colonnes object
+        df1 = self._normalize_for_comparison(df1)
+        df2 = self._normalize_for_comparison(df2)
 
-        return df1_sorted.equals(df2_sorted)
+        # Comparaison indépendante de l'ordre des lignes : on compare les multiensembles
+        # de hash de lignes (un seul tableau uint64 trié) au lieu de trier les deux
+        # DataFrames sur toutes leurs colonnes
+        hashes1 = np.sort(pd.util.hash_pandas_object(df1, index=False).to_numpy())
+        hashes2 = np.sort(pd.util.hash_pandas_object(df2, index=False).to_numpy())
+
+        return np.array_equal(hashes1, hashes2)
+
+    def _normalize_for_comparison(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Copie du DataFrame avec les types de config.yaml appliqués et les colonnes
+        category ramenées à leurs valeurs, pour comparer une agrégation fraîche
+        et un fichier relu indépendamment de leurs types.
+        """
+        df = self._apply_dtypes(df.copy())
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(object)
+        return df
 
     def load_aggregated_data(self) -> pd.DataFrame:
         output_path = Path(self.config['output_files']['aggregated_data'])
         if output_path.exists():
-            self.logger.debug(f"Chargement du fichier agrégé: {output_path}")
+            self.logger.debug("Chargement du fichier agrégé: %s", output_path)
             df = pd.read_excel(output_path)
-            self.logger.debug(f"Fichier chargé: {len(df)} lignes, {len(df.columns)} colonnes")
+            self.logger.debug("Fichier chargé: %d lignes, %d colonnes", len(df), len(df.columns))
 
             # Nettoyer la colonne cas_id pour assurer la cohérence avant toute manipulation
             df = self._clean_cas_id_column(df)
@@ -529,26 +653,28 @@ class DataManager:
                     )
                     df = df.drop(columns=['_temp_id'])
 
-                # Compter les doublons AVANT déduplication
-                duplicates_before = df['unique_substance_id'].duplicated().sum()
-
-                if duplicates_before > 0:
-                    self.logger.warning(f"ATTENTION: {duplicates_before} doublons détectés dans le fichier agrégé !")
+                # Doublons AVANT déduplication : toujours signalés (fichier agrégé corrompu) ;
+                # le masque sert ensuite à la déduplication (keep='last')
+                dup_mask = df['unique_substance_id'].duplicated(keep='last')
+                if dup_mask.any():
+                    self.logger.warning("ATTENTION: %d doublons détectés dans le fichier agrégé !", dup_mask.sum())
                     # Afficher quelques exemples
                     duplicated_ids = df[df['unique_substance_id'].duplicated(keep=False)]['unique_substance_id'].value_counts().head(5)
-                    self.logger.warning(f"Exemples d'IDs dupliqués:\n{duplicated_ids}")
+                    self.logger.warning("Exemples d'IDs dupliqués:\n%s", duplicated_ids)
 
-                # Déduplication
-                df = df.drop_duplicates(subset=['unique_substance_id'], keep='last').reset_index(drop=True)
-                duplicates_after = df['unique_substance_id'].duplicated().sum()
+                    # Déduplication
+                    df = df[~dup_mask].reset_index(drop=True)
 
-                self.logger.debug(f"Après déduplication: {len(df)} lignes, {duplicates_after} doublons restants")
+                # Vérification après déduplication (uniquement pour le diagnostic)
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    duplicates_after = df['unique_substance_id'].duplicated().sum()
+                    self.logger.debug("Après déduplication: %d lignes, %d doublons restants", len(df), duplicates_after)
 
-                if duplicates_after > 0:
-                    self.logger.error(f"ERREUR: {duplicates_after} doublons PERSISTENT après drop_duplicates!")
-                    # Forcer une seconde déduplication
-                    df = df.drop_duplicates(subset=['unique_substance_id'], keep='last').reset_index(drop=True)
-                    self.logger.debug(f"Après 2ème déduplication: {len(df)} lignes")
+                    if duplicates_after > 0:
+                        self.logger.error(f"ERREUR: {duplicates_after} doublons PERSISTENT après drop_duplicates!")
+                        # Forcer une seconde déduplication
+                        df = df.drop_duplicates(subset=['unique_substance_id'], keep='last').reset_index(drop=True)
+                        self.logger.debug(f"Après 2ème déduplication: {len(df)} lignes")
 
             return df
 
@@ -556,7 +682,7 @@ class DataManager:
         return pd.DataFrame()
 
     def get_list_description(self, list_name: str) -> str:
-        list_config = next((l for l in self.config['source_files']['lists'] if l['name'] == list_name), None)
+        list_config = self._list_configs.get(list_name)
         if list_config:
             return list_config.get('description', list_name)
         return list_name
@@ -565,7 +691,7 @@ class DataManager:
         """
         Retourne la date de modification d'un fichier Excel source.
         """
-        list_config = next((l for l in self.config['source_files']['lists'] if l['name'] == list_name), None)
+        list_config = self._list_configs.get(list_name)
         if not list_config:
             return "N/A"
 
@@ -1,44 +1,160 @@
+import contextlib
 import pandas as pd
 from pathlib import Path
 import yaml
 from datetime import datetime
 import shutil
+import sqlite3
 from backend.logger import get_logger
 
 
 class HistoryManager:
+    CHANGES_TABLE = "change_history"
+    SUMMARY_TABLE = "summary_history"
+    INDEXED_COLUMNS = ('change_type', 'source_list', 'cas_id', 'timestamp')
+
     def __init__(self, config_path: str = "config.yaml"):
         self.logger = get_logger()
         self.logger.info("Initialisation du HistoryManager")
         self.config = self._load_config(config_path)
+        self.history_db = Path(self.config['output_files']['history_database'])
+        # Anciens fichiers Excel, importés une seule fois dans la base SQLite
         self.history_file = Path(self.config['output_files']['change_history'])
         self.summary_history_file = Path(self.config['output_files']['summary_history'])
         self.archive_folder = Path(self.config['general']['archive_folder'])
         self.archive_old_files = self.config['general']['archive_old_files']
-        self.logger.debug(f"Fichier historique: {self.history_file}")
+        self.logger.debug(f"Base historique: {self.history_db}")
+        self._migrate_legacy_file(self.CHANGES_TABLE, self.history_file)
+        self._migrate_legacy_file(self.SUMMARY_TABLE, self.summary_history_file)
 
     def _load_config(self, config_path: str) -> dict:
         with open(config_path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Ouvre la base historique. À utiliser avec
+        `with contextlib.closing(self._connect()) as con, con:` : transaction validée
+        (ou annulée) par `con`, connexion fermée par closing, même en cas d'exception.
+        """
+        self.history_db.parent.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.history_db)
+
+    def _table_columns(self, con: sqlite3.Connection, table: str) -> list:
+        """
+        Retourne les colonnes d'une table (liste vide si la table n'existe pas).
+        """
+        return [row[1] for row in con.execute(f'PRAGMA table_info("{table}")')]
+
+    def _append_rows(self, table: str, df: pd.DataFrame) -> None:
+        """
+        Ajoute les lignes de df à la table (INSERT) sans relire l'historique existant.
+        Les colonnes absentes de la table sont ajoutées à la volée.
+        """
+        df = df.copy()
+        # Les dictionnaires (new_values/old_values) sont stockés sous forme texte,
+        # comme le faisait l'export Excel
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].map(lambda v: str(v) if isinstance(v, (dict, list)) else v)
+        # Mêmes types qu'à la lecture, que les lignes viennent de l'ancien Excel
+        # ou de la détection de changements
+        df = self._apply_dtypes(df)
+
+        with contextlib.closing(self._connect()) as con, con:
+            existing_columns = self._table_columns(con, table)
+            if existing_columns:
+                for col in df.columns:
+                    if col not in existing_columns:
+                        con.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}"')
+            df.to_sql(table, con, if_exists='append', index=False)
+            if table == self.CHANGES_TABLE:
+                self._create_indexes(con)
+
+    def _create_indexes(self, con: sqlite3.Connection) -> None:
+        """
+        Index sur les colonnes utilisées par les filtres get_changes_by_*.
+        """
+        columns = self._table_columns(con, self.CHANGES_TABLE)
+        for col in self.INDEXED_COLUMNS:
+            if col in columns:
+                con.execute(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{self.CHANGES_TABLE}_{col}" '
+                    f'ON "{self.CHANGES_TABLE}" ("{col}")'
+                )
+
+    def _read_table(self, table: str, where: str = "", params: tuple = (),
+                    order_by: str = "", limit: int = None) -> pd.DataFrame:
+        """
+        Lit une table en laissant SQLite appliquer le filtre, le tri et la limite,
+        pour ne pas charger tout l'historique quand seules quelques lignes sont utiles.
+        """
+        if not self.history_db.exists():
+            return pd.DataFrame()
+
+        with contextlib.closing(self._connect()) as con, con:
+            columns = self._table_columns(con, table)
+            if not columns:
+                df = pd.DataFrame()
+            else:
+                query = f'SELECT * FROM "{table}"'
+                if where:
+                    query += f" WHERE {where}"
+                if order_by in columns:
+                    query += f' ORDER BY "{order_by}" DESC'
+                if limit is not None:
+                    query += " LIMIT ?"
+                    params = tuple(params) + (limit,)
+                df = pd.read_sql_query(query, con, params=params)
+        return self._apply_dtypes(df)
+
+    def _apply_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Applique les types de la section 'dtypes' de config.yaml, à l'écriture comme
+        à la lecture (cas_id et change_type en string[pyarrow] : comparaisons et
+        groupby plus rapides)
+        """
+        for column, dtype in self.config.get('dtypes', {}).items():
+            if column in df.columns:
+                df[column] = df[column].astype(dtype)
+        return df
+
+    def _select_changes(self, column: str, value: str) -> pd.DataFrame:
+        if not self.history_db.exists():
+            return pd.DataFrame()
+
+        with contextlib.closing(self._connect()) as con, con:
+            has_column = column in self._table_columns(con, self.CHANGES_TABLE)
+        if not has_column:
+            return pd.DataFrame()
+
+        return self._read_table(self.CHANGES_TABLE, where=f'"{column}" = ?', params=(value,))
+
+    def _migrate_legacy_file(self, table: str, legacy_file: Path) -> None:
+        """
+        Importe un ancien historique Excel dans la base si la table n'existe pas encore.
+        """
+        if not legacy_file.exists():
+            return
+
+        with contextlib.closing(self._connect()) as con, con:
+            already_migrated = bool(self._table_columns(con, table))
+        if already_migrated:
+            return
+
+        self.logger.info(f"Migration de {legacy_file} vers {self.history_db} (table {table})")
+        legacy_df = pd.read_excel(legacy_file)
+        if legacy_df.empty:
+            return
+        self._append_rows(table, legacy_df)
+
     def load_history(self) -> pd.DataFrame:
-        if self.history_file.exists():
-            return pd.read_excel(self.history_file)
-        return pd.DataFrame()
+        return self._read_table(self.CHANGES_TABLE)
 
     def save_changes(self, changes_df: pd.DataFrame) -> None:
         if changes_df.empty:
             return
 
-        existing_history = self.load_history()
-
-        if existing_history.empty:
-            updated_history = changes_df
-        else:
-            updated_history = pd.concat([existing_history, changes_df], ignore_index=True)
-
-        self.history_file.parent.mkdir(parents=True, exist_ok=True)
-        updated_history.to_excel(self.history_file, index=False)
+        self._append_rows(self.CHANGES_TABLE, changes_df)
 
     def archive_files(self, list_name: str, file_path: Path) -> None:
         if not self.archive_old_files:
@@ -55,39 +171,25 @@ class HistoryManager:
         shutil.copy2(file_path, archive_path)
 
     def get_recent_changes(self, limit: int = 100) -> pd.DataFrame:
-        history = self.load_history()
-        if history.empty:
-            return history
-
-        if 'timestamp' in history.columns:
-            history = history.sort_values('timestamp', ascending=False)
-
-        return history.head(limit)
+        return self._read_table(self.CHANGES_TABLE, order_by='timestamp', limit=limit)
 
     def get_changes_by_type(self, change_type: str) -> pd.DataFrame:
-        history = self.load_history()
-        if history.empty:
-            return history
-
-        return history[history['change_type'] == change_type]
+        return self._select_changes('change_type', change_type)
 
     def get_changes_by_list(self, list_name: str) -> pd.DataFrame:
-        history = self.load_history()
-        if history.empty:
-            return history
-
-        return history[history['source_list'] == list_name]
+        return self._select_changes('source_list', list_name)
 
     def get_changes_by_cas(self, cas_id: str) -> pd.DataFrame:
-        history = self.load_history()
-        if history.empty:
-            return history
-
-        return history[history['cas_id'] == cas_id]
+        return self._select_changes('cas_id', cas_id)
 
     def clear_history(self) -> None:
-        if self.history_file.exists():
-            self.history_file.unlink()
+        # On vide la table plutôt que de la supprimer pour ne pas réimporter l'ancien fichier Excel
+        if not self.history_db.exists():
+            return
+
+        with contextlib.closing(self._connect()) as con, con:
+            if self._table_columns(con, self.CHANGES_TABLE):
+                con.execute(f'DELETE FROM "{self.CHANGES_TABLE}"')
 
     def save_summary(self, summary_df: pd.DataFrame) -> None:
         """
@@ -99,23 +201,13 @@ class HistoryManager:
         summary_with_ts = summary_df.copy()
         summary_with_ts['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        existing_summary = self.load_summary_history()
-
-        if existing_summary.empty:
-            updated_summary = summary_with_ts
-        else:
-            updated_summary = pd.concat([existing_summary, summary_with_ts], ignore_index=True)
-
-        self.summary_history_file.parent.mkdir(parents=True, exist_ok=True)
-        updated_summary.to_excel(self.summary_history_file, index=False)
+        self._append_rows(self.SUMMARY_TABLE, summary_with_ts)
 
     def load_summary_history(self) -> pd.DataFrame:
         """
         Charge l'historique complet des résumés de chargement.
         """
-        if self.summary_history_file.exists():
-            df = pd.read_excel(self.summary_history_file)
-            if 'timestamp' in df.columns:
-                return df.sort_values('timestamp', ascending=False)
-            return df
-        return pd.DataFrame()
+        df = self._read_table(self.SUMMARY_TABLE)
+        if 'timestamp' in df.columns:
+            return df.sort_values('timestamp', ascending=False)
+        return df
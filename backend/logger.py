@@ -1,12 +1,16 @@
+import atexit
 import logging
+import queue
 import sys
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from datetime import datetime
 
 
 class Logger:
-    def __init__(self, name: str = "echa_app", log_dir: str = "logs", max_bytes: int = 10485760, backup_count: int = 5):
+    def __init__(self, name: str = "echa_app", log_dir: str = "logs", max_bytes: int = 10485760, backup_count: int = 5,
+                 level: int = logging.INFO):
         self.name = name
         self.log_dir = Path(log_dir)
         self.max_bytes = max_bytes
@@ -15,14 +19,14 @@ class Logger:
         self.log_dir.mkdir(parents=True, exist_ok=True)
 
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
+        self.logger.setLevel(level)
 
         if not self.logger.handlers:
             self._setup_handlers()
 
     def _setup_handlers(self):
         formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
 
@@ -60,37 +64,60 @@ class Logger:
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(formatter)
 
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(debug_handler)
-        self.logger.addHandler(info_handler)
-        self.logger.addHandler(error_handler)
+        # Les écritures (console et fichiers, rotation comprise) sont faites par un
+        # thread dédié : le thread appelant ne fait que déposer l'enregistrement dans la file
+        self._queue = queue.Queue(-1)
+        self._listener = QueueListener(
+            self._queue,
+            console_handler,
+            debug_handler,
+            info_handler,
+            error_handler,
+            respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self._listener.stop)
+
+        self.logger.addHandler(QueueHandler(self._queue))
+
+    def set_debug(self, enabled: bool = True):
+        """
+        Active (ou désactive) les messages DEBUG, désactivés par défaut.
+        """
+        self.logger.setLevel(logging.DEBUG if enabled else logging.INFO)
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
 
-    def debug(self, message: str):
-        self.logger.debug(message)
+    def debug(self, message: str, *args, **kwargs):
+        self.logger.debug(message, *args, **kwargs)
 
-    def info(self, message: str):
-        self.logger.info(message)
+    def info(self, message: str, *args, **kwargs):
+        self.logger.info(message, *args, **kwargs)
 
-    def warning(self, message: str):
-        self.logger.warning(message)
+    def warning(self, message: str, *args, **kwargs):
+        self.logger.warning(message, *args, **kwargs)
 
-    def error(self, message: str, exc_info: bool = False):
-        self.logger.error(message, exc_info=exc_info)
+    def error(self, message: str, *args, **kwargs):
+        self.logger.error(message, *args, **kwargs)
 
-    def critical(self, message: str, exc_info: bool = False):
-        self.logger.critical(message, exc_info=exc_info)
+    def critical(self, message: str, *args, **kwargs):
+        self.logger.critical(message, *args, **kwargs)
 
-    def exception(self, message: str):
-        self.logger.exception(message)
+    def exception(self, message: str, *args, **kwargs):
+        self.logger.exception(message, *args, **kwargs)
 
     def get_logger(self):
         return self.logger
 
 
-_default_logger = None
+_loggers = {}
+_loggers_lock = threading.Lock()
 
 def get_logger(name: str = "echa_app") -> Logger:
-    global _default_logger
-    if _default_logger is None:
-        _default_logger = Logger(name)
-    return _default_logger
+    with _loggers_lock:
+        logger = _loggers.get(name)
+        if logger is None:
+            logger = Logger(name)
+            _loggers[name] = logger
+    return logger
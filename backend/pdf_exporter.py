@@ -1,29 +1,51 @@
 import pandas as pd
+import numpy as np
 from pathlib import Path
 from datetime import datetime
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')
-from io import BytesIO
 import base64
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from backend.logger import get_logger
 
+# Les modules ReportLab sont importés dans les méthodes qui les utilisent :
+# importer le backend (ou instancier PDFExporter au démarrage de l'UI)
+# ne paie leur coût de chargement qu'à la première génération de rapport.
+
+# Couleurs du rapport, converties une fois en couleurs ReportLab dans _init_styles
+_BLUE = '#1f77b4'
+_DARK = '#2c3e50'
+_CHART_COLORS = ('#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd')
+_CHANGE_COLORS = {
+    'insertion': '#2ca02c',
+    'deletion': '#d62728',
+    'modification': '#ff7f0e'
+}
+
 
 class PDFExporter:
     def __init__(self):
         self.logger = get_logger()
+        self.styles = None
+
+    def _init_styles(self):
+        """Construit les styles ReportLab une seule fois, au premier rapport."""
+        if self.styles is not None:
+            return
+
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import TableStyle
+
+        blue = colors.HexColor(_BLUE)
+        self._chart_colors = tuple(colors.HexColor(c) for c in _CHART_COLORS)
+        self._change_colors = {ct: colors.HexColor(c) for ct, c in _CHANGE_COLORS.items()}
+        self._default_change_color = blue
+
         self.styles = getSampleStyleSheet()
         self.title_style = ParagraphStyle(
             'CustomTitle',
             parent=self.styles['Heading1'],
             fontSize=24,
-            textColor=colors.HexColor('#1f77b4'),
+            textColor=blue,
             spaceAfter=30,
             alignment=TA_CENTER
         )
@@ -31,15 +53,51 @@ class PDFExporter:
             'CustomHeading',
             parent=self.styles['Heading2'],
             fontSize=16,
-            textColor=colors.HexColor('#2c3e50'),
+            textColor=colors.HexColor(_DARK),
             spaceAfter=12,
             spaceBefore=12
         )
 
+        # Styles de tableaux construits une seule fois et partagés entre les rapports
+        self._stats_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), blue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ])
+        # Tableaux des derniers changements et des substances
+        self._list_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), blue),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white]),
+        ])
+
     def generate_report(self, aggregated_df: pd.DataFrame, history_df: pd.DataFrame, output_path: str) -> bool:
         self.logger.info(f"Generation du rapport PDF: {output_path}")
 
         try:
+            from reportlab.lib.pagesizes import A4
+
+            if aggregated_df.empty and history_df.empty:
+                return self._write_empty_report(output_path, A4)
+
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+
+            self._init_styles()
             doc = SimpleDocTemplate(
                 output_path,
                 pagesize=A4,
@@ -81,9 +139,43 @@ class PDFExporter:
             self.logger.error(f"Erreur lors de la generation du PDF: {str(e)}", exc_info=True)
             return False
 
+    def _write_empty_report(self, output_path: str, pagesize) -> bool:
+        """
+        Rapport d'une page sans données, dessiné directement sur le canvas
+        (sans passer par la mise en page Platypus).
+        """
+        from reportlab.pdfgen import canvas
+
+        width, height = pagesize
+        c = canvas.Canvas(output_path, pagesize=pagesize)
+        c.setFont('Helvetica-Bold', 24)
+        c.drawCentredString(width / 2, height - 60, "Rapport de Suivi ECHA")
+        c.setFont('Helvetica', 10)
+        c.drawString(30, height - 100, f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+        c.drawString(30, height - 130, "Aucune donnee disponible")
+        c.save()
+        self.logger.info(f"Rapport PDF vide genere: {output_path}")
+        return True
+
+    @staticmethod
+    def _column_values(df: pd.DataFrame, name: str, fill: str = 'N/A', maxlen: int = None) -> np.ndarray:
+        """
+        Valeurs d'une colonne sous forme de tableau de chaînes, 'N/A' pour les
+        valeurs manquantes ou si la colonne est absente, tronquées à maxlen caractères.
+        """
+        if name not in df.columns:
+            return np.full(len(df), fill, dtype=object)
+        values = df[name].to_numpy(dtype=object)
+        values = pd.Series(np.where(pd.isna(values), fill, values).astype(str))
+        if maxlen is not None:
+            values = values.str.slice(0, maxlen)
+        return values.to_numpy()
+
     def _add_statistics_section(self, aggregated_df: pd.DataFrame, history_df: pd.DataFrame):
-        elements = []
-        elements.append(Paragraph("Statistiques Generales", self.heading_style))
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Table, Paragraph, Spacer
+
+        yield Paragraph("Statistiques Generales", self.heading_style)
 
         stats_data = [
             ['Metrique', 'Valeur'],
@@ -94,9 +186,10 @@ class PDFExporter:
         ]
 
         if not history_df.empty and 'change_type' in history_df.columns:
-            insertions = len(history_df[history_df['change_type'] == 'insertion'])
-            deletions = len(history_df[history_df['change_type'] == 'deletion'])
-            modifications = len(history_df[history_df['change_type'] == 'modification'])
+            change_counts = history_df['change_type'].value_counts()
+            insertions = int(change_counts.get('insertion', 0))
+            deletions = int(change_counts.get('deletion', 0))
+            modifications = int(change_counts.get('modification', 0))
             stats_data.extend([
                 ['Insertions', str(insertions)],
                 ['Suppressions', str(deletions)],
@@ -104,179 +197,162 @@ class PDFExporter:
             ])
 
         stats_table = Table(stats_data, colWidths=[3*inch, 2*inch])
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ]))
+        stats_table.setStyle(self._stats_style)
 
-        elements.append(stats_table)
-        elements.append(Spacer(1, 20))
-        return elements
+        yield stats_table
+        yield Spacer(1, 20)
 
     def _add_distribution_chart(self, aggregated_df: pd.DataFrame):
-        elements = []
-        elements.append(Paragraph("Repartition par Liste Source", self.heading_style))
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph
+        from reportlab.graphics.shapes import Drawing, Group, String
+        from reportlab.graphics.charts.barcharts import VerticalBarChart
+
+        yield Paragraph("Repartition par Liste Source", self.heading_style)
 
         try:
-            fig, ax = plt.subplots(figsize=(8, 5))
             source_counts = aggregated_df['source_list'].value_counts()
 
-            colors_list = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
-            ax.bar(range(len(source_counts)), source_counts.values, color=colors_list[:len(source_counts)])
-            ax.set_xlabel('Liste Source', fontsize=12)
-            ax.set_ylabel('Nombre de Substances', fontsize=12)
-            ax.set_title('Distribution des Substances par Liste', fontsize=14, fontweight='bold')
-            ax.set_xticks(range(len(source_counts)))
-            ax.set_xticklabels(source_counts.index, rotation=45, ha='right')
-            ax.grid(axis='y', alpha=0.3)
-
-            plt.tight_layout()
-
-            img_buffer = BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-            img_buffer.seek(0)
-            plt.close()
-
-            img = Image(img_buffer, width=6*inch, height=3.75*inch)
-            elements.append(img)
+            # Graphique vectoriel ReportLab (même taille que l'ancienne image 6x3.75 inch)
+            drawing = Drawing(6*inch, 3.75*inch)
+            drawing.add(String(3*inch, 3.5*inch, 'Distribution des Substances par Liste',
+                               fontName='Helvetica-Bold', fontSize=14, textAnchor='middle'))
+
+            chart = VerticalBarChart()
+            chart.x = 0.8*inch
+            chart.y = 1.2*inch
+            chart.width = 5*inch
+            chart.height = 2*inch
+            chart.data = [[int(v) for v in source_counts.values]]
+            chart.categoryAxis.categoryNames = [str(name) for name in source_counts.index]
+            chart.categoryAxis.labels.angle = 45
+            chart.categoryAxis.labels.boxAnchor = 'ne'
+            chart.categoryAxis.labels.dy = -4
+            chart.categoryAxis.labels.fontName = 'Helvetica'
+            chart.categoryAxis.labels.fontSize = 8
+            chart.valueAxis.valueMin = 0
+            chart.valueAxis.visibleGrid = True
+            chart.valueAxis.gridStrokeColor = colors.lightgrey
+            chart.valueAxis.labels.fontName = 'Helvetica'
+            chart.valueAxis.labels.fontSize = 8
+            for i in range(len(source_counts)):
+                chart.bars[(0, i)].fillColor = self._chart_colors[i % len(self._chart_colors)]
+            drawing.add(chart)
+
+            drawing.add(String(chart.x + chart.width / 2, 0.05*inch, 'Liste Source',
+                               fontName='Helvetica', fontSize=10, textAnchor='middle'))
+            y_label = Group(String(0, 0, 'Nombre de Substances', fontName='Helvetica', fontSize=10, textAnchor='middle'))
+            y_label.translate(0.2*inch, chart.y + chart.height / 2)
+            y_label.rotate(90)
+            drawing.add(y_label)
+
+            yield drawing
 
         except Exception as e:
             self.logger.error(f"Erreur lors de la creation du graphique de distribution: {str(e)}")
-            elements.append(Paragraph("Erreur lors de la generation du graphique", self.styles['Normal']))
-
-        return elements
+            yield Paragraph("Erreur lors de la generation du graphique", self.styles['Normal'])
 
     def _add_changes_chart(self, history_df: pd.DataFrame):
-        elements = []
-        elements.append(Paragraph("Repartition des Changements", self.heading_style))
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph
+        from reportlab.graphics.shapes import Drawing, String
+        from reportlab.graphics.charts.piecharts import Pie
+
+        yield Paragraph("Repartition des Changements", self.heading_style)
 
         try:
             if 'change_type' not in history_df.columns:
-                elements.append(Paragraph("Donnees de changements non disponibles", self.styles['Normal']))
-                return elements
+                yield Paragraph("Donnees de changements non disponibles", self.styles['Normal'])
+                return
 
-            fig, ax = plt.subplots(figsize=(8, 5))
             change_counts = history_df['change_type'].value_counts()
-
-            colors_map = {
-                'insertion': '#2ca02c',
-                'deletion': '#d62728',
-                'modification': '#ff7f0e'
-            }
-            colors_list = [colors_map.get(ct, '#1f77b4') for ct in change_counts.index]
-
-            ax.pie(change_counts.values, labels=change_counts.index, autopct='%1.1f%%',
-                   colors=colors_list, startangle=90)
-            ax.set_title('Repartition des Types de Changements', fontsize=14, fontweight='bold')
-
-            plt.tight_layout()
-
-            img_buffer = BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=100, bbox_inches='tight')
-            img_buffer.seek(0)
-            plt.close()
-
-            img = Image(img_buffer, width=6*inch, height=3.75*inch)
-            elements.append(img)
+            total = int(change_counts.sum())
+
+            drawing = Drawing(6*inch, 3.75*inch)
+            drawing.add(String(3*inch, 3.5*inch, 'Repartition des Types de Changements',
+                               fontName='Helvetica-Bold', fontSize=14, textAnchor='middle'))
+
+            pie = Pie()
+            pie.x = 1.9*inch
+            pie.y = 0.5*inch
+            pie.width = 2.5*inch
+            pie.height = 2.5*inch
+            pie.data = [int(v) for v in change_counts.values]
+            pie.labels = [f"{ct} ({count / total:.1%})" for ct, count in change_counts.items()]
+            pie.startAngle = 90
+            pie.direction = 'anticlockwise'
+            pie.slices.strokeWidth = 0.5
+            pie.slices.fontName = 'Helvetica'
+            pie.slices.fontSize = 9
+            pie.sideLabels = True
+            for i, ct in enumerate(change_counts.index):
+                pie.slices[i].fillColor = self._change_colors.get(ct, self._default_change_color)
+            drawing.add(pie)
+
+            yield drawing
 
         except Exception as e:
             self.logger.error(f"Erreur lors de la creation du graphique des changements: {str(e)}")
-            elements.append(Paragraph("Erreur lors de la generation du graphique", self.styles['Normal']))
-
-        return elements
+            yield Paragraph("Erreur lors de la generation du graphique", self.styles['Normal'])
 
     def _add_recent_changes_table(self, history_df: pd.DataFrame, limit: int = 20):
-        elements = []
-        elements.append(Paragraph(f"Derniers Changements (max {limit})", self.heading_style))
+        from reportlab.lib.units import inch
+        from reportlab.platypus import LongTable, Paragraph
+
+        yield Paragraph(f"Derniers Changements (max {limit})", self.heading_style)
 
         try:
             recent_changes = history_df.head(limit)
 
-            table_data = [['Date', 'Type', 'Liste', 'CAS ID', 'CAS Name']]
-
-            for _, row in recent_changes.iterrows():
-                timestamp = row.get('timestamp', 'N/A')
-                if isinstance(timestamp, str):
-                    try:
-                        dt = datetime.fromisoformat(timestamp)
-                        timestamp = dt.strftime('%d/%m/%Y %H:%M')
-                    except:
-                        pass
-
-                table_data.append([
-                    str(timestamp)[:16],
-                    str(row.get('change_type', 'N/A')),
-                    str(row.get('source_list', 'N/A')),
-                    str(row.get('cas_id', 'N/A'))[:20],
-                    str(row.get('cas_name', 'N/A'))[:30]
-                ])
-
-            changes_table = Table(table_data, colWidths=[1.3*inch, 1*inch, 0.8*inch, 1.2*inch, 2.2*inch])
-            changes_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white]),
-            ]))
-
-            elements.append(changes_table)
+            # Dates ISO reformatées en une passe ; les valeurs non interprétables sont gardées telles quelles
+            raw_timestamps = pd.Series(self._column_values(recent_changes, 'timestamp'))
+            formatted_timestamps = (
+                pd.to_datetime(raw_timestamps, errors='coerce', format='ISO8601')
+                .dt.strftime('%d/%m/%Y %H:%M')
+                .fillna(raw_timestamps)
+                .str[:16]
+            )
+
+            # En-tête puis toutes les lignes converties d'un bloc
+            table_data = [['Date', 'Type', 'Liste', 'CAS ID', 'CAS Name']] + np.column_stack([
+                formatted_timestamps.to_numpy(dtype=object),
+                self._column_values(recent_changes, 'change_type'),
+                self._column_values(recent_changes, 'source_list'),
+                self._column_values(recent_changes, 'cas_id', maxlen=20),
+                self._column_values(recent_changes, 'cas_name', maxlen=30)
+            ]).tolist()
+
+            # LongTable : mise en page en une passe, en-tête répété sur chaque page
+            changes_table = LongTable(table_data, colWidths=[1.3*inch, 1*inch, 0.8*inch, 1.2*inch, 2.2*inch], repeatRows=1)
+            changes_table.setStyle(self._list_table_style)
+
+            yield changes_table
 
         except Exception as e:
             self.logger.error(f"Erreur lors de la creation du tableau des changements: {str(e)}")
-            elements.append(Paragraph("Erreur lors de la generation du tableau", self.styles['Normal']))
-
-        return elements
+            yield Paragraph("Erreur lors de la generation du tableau", self.styles['Normal'])
 
     def _add_substances_table(self, aggregated_df: pd.DataFrame, limit: int = 30):
-        elements = []
-        elements.append(Paragraph(f"Substances (max {limit})", self.heading_style))
+        from reportlab.lib.units import inch
+        from reportlab.platypus import LongTable, Paragraph
+
+        yield Paragraph(f"Substances (max {limit})", self.heading_style)
 
         try:
             substances = aggregated_df.head(limit)
 
-            table_data = [['CAS ID', 'CAS Name', 'Liste Source']]
-
-            for _, row in substances.iterrows():
-                table_data.append([
-                    str(row.get('cas_id', 'N/A'))[:20],
-                    str(row.get('cas_name', 'N/A'))[:40],
-                    str(row.get('source_list', 'N/A'))
-                ])
-
-            substances_table = Table(table_data, colWidths=[1.5*inch, 3.5*inch, 1.5*inch])
-            substances_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1f77b4')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white]),
-            ]))
-
-            elements.append(substances_table)
+            table_data = [['CAS ID', 'CAS Name', 'Liste Source']] + np.column_stack([
+                self._column_values(substances, 'cas_id', maxlen=20),
+                self._column_values(substances, 'cas_name', maxlen=40),
+                self._column_values(substances, 'source_list')
+            ]).tolist()
+
+            substances_table = LongTable(table_data, colWidths=[1.5*inch, 3.5*inch, 1.5*inch], repeatRows=1)
+            substances_table.setStyle(self._list_table_style)
+
+            yield substances_table
 
         except Exception as e:
             self.logger.error(f"Erreur lors de la creation du tableau des substances: {str(e)}")
-            elements.append(Paragraph("Erreur lors de la generation du tableau", self.styles['Normal']))
-
-        return elements
+            yield Paragraph("Erreur lors de la generation du tableau", self.styles['Normal'])
@@ -3,12 +3,42 @@ Gestionnaire des préférences utilisateur
 Gère la sauvegarde et le chargement des préférences (colonnes, filtres, etc.)
 """
 
+import copy
 import json
+import os
 from pathlib import Path
 from typing import List, Dict, Optional
 from backend.logger import get_logger
 
 
+# orjson (optionnel) sérialise nettement plus vite que le module json standard ;
+# les deux variantes travaillent sur des bytes UTF-8 avec une indentation de 2
+try:
+    import orjson
+
+    def _loads(data: bytes):
+        return orjson.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _loads(data: bytes):
+        return json.loads(data)
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+# Cache des préférences lues, par fichier : (mtime_ns, préférences)
+_PREFS_CACHE: Dict[Path, tuple] = {}
+
+
+def _filter_columns(wanted: List[str], all_columns: List[str]) -> List[str]:
+    """Colonnes de wanted qui existent dans all_columns, dans l'ordre de wanted"""
+    available = set(all_columns)
+    return [col for col in wanted if col in available]
+
+
 class PreferencesManager:
     def __init__(self, preferences_file: str = "data/user_preferences.json"):
         self.logger = get_logger()
@@ -45,8 +75,14 @@ class PreferencesManager:
         """Charge les préférences depuis le fichier JSON"""
         if self.preferences_file.exists():
             try:
-                with open(self.preferences_file, 'r', encoding='utf-8') as f:
-                    prefs = json.load(f)
+                mtime = self.preferences_file.stat().st_mtime_ns
+                cached = _PREFS_CACHE.get(self.preferences_file)
+                if cached is not None and cached[0] == mtime:
+                    # Fichier inchangé : copie du cache pour ne pas partager l'état entre instances
+                    return copy.deepcopy(cached[1])
+
+                prefs = _loads(self.preferences_file.read_bytes())
+                _PREFS_CACHE[self.preferences_file] = (mtime, copy.deepcopy(prefs))
                 self.logger.debug("Préférences chargées depuis le fichier")
                 return prefs
             except Exception as e:
@@ -74,8 +110,17 @@ class PreferencesManager:
         """Sauvegarde les préférences dans le fichier JSON"""
         try:
             self.preferences_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.preferences_file, 'w', encoding='utf-8') as f:
-                json.dump(self.preferences, f, indent=2, ensure_ascii=False)
+            data = _dumps(self.preferences)
+            # Écriture dans un fichier temporaire puis remplacement atomique :
+            # le fichier de préférences n'est jamais laissé à moitié écrit
+            tmp_file = self.preferences_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, self.preferences_file)
+            # Le cache reflète la version écrite : pas de relecture au prochain chargement
+            _PREFS_CACHE[self.preferences_file] = (
+                self.preferences_file.stat().st_mtime_ns, copy.deepcopy(self.preferences)
+            )
             self.logger.info("Préférences sauvegardées avec succès")
             return True
         except Exception as e:
@@ -120,7 +165,7 @@ class PreferencesManager:
             custom = self.preferences.get('column_selection', {}).get('custom_columns')
             if custom:
                 # Filtrer pour ne garder que les colonnes qui existent encore
-                return [col for col in custom if col in all_columns]
+                return _filter_columns(custom, all_columns)
             else:
                 # Fallback sur essentials si pas de custom défini
                 return self.get_columns_for_profile('essentials', all_columns)
@@ -128,7 +173,7 @@ class PreferencesManager:
         if profile in self.COLUMN_PROFILES:
             profile_cols = self.COLUMN_PROFILES[profile]['columns']
             # Filtrer pour ne garder que les colonnes qui existent
-            return [col for col in profile_cols if col in all_columns]
+            return _filter_columns(profile_cols, all_columns)
         
         # Fallback sur essentials
         return self.get_columns_for_profile('essentials', all_columns)
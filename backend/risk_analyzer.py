@@ -3,18 +3,177 @@ Module d'analyse de risque et de scoring des substances chimiques
 Calcule des scores de criticité basés sur l'historique et fait des prédictions simples
 """
 
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
 from io import BytesIO
 from backend.logger import get_logger
 
 logger = get_logger()
 
 
+def _new_figure(figsize: Tuple[float, float]) -> 'matplotlib.figure.Figure':
+    """
+    Crée une figure matplotlib rattachée à un canvas Agg, sans passer par pyplot :
+    aucun état global partagé entre les sessions (figure courante, gestionnaire de figures).
+    L'import de matplotlib est fait à la première utilisation seulement.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+# Barèmes des composantes du score : borne haute (incluse) de chaque palier,
+# puis score de chaque palier (le dernier s'applique au-delà de la dernière borne)
+_MOD_FREQ_EDGES = np.array([0, 2, 5, 10])
+_MOD_FREQ_SCORES = np.array([0.0, 25.0, 50.0, 75.0, 100.0])
+_LIST_PRESENCE_EDGES = np.array([1, 2, 3])
+_LIST_PRESENCE_SCORES = np.array([25.0, 50.0, 75.0, 100.0])
+_RECENCY_EDGES = np.array([7, 30, 90, 365])
+_RECENCY_SCORES = np.array([100.0, 75.0, 50.0, 25.0, 0.0])
+# Score selon le type du changement le plus récent (autre type ou aucun : 0)
+_CHANGE_TYPE_SCORES = {
+    'suppression': 100.0,
+    'modification': 60.0,
+    'insertion': 30.0
+}
+
+# Seuils (bas, inclus) des niveaux de risque, comme dans _get_risk_level
+_RISK_LEVEL_THRESHOLDS = np.array([26, 51, 76])
+_RISK_LEVELS = np.array(["Faible", "Moyen", "Élevé", "Critique"], dtype=object)
+_RISK_BADGES = np.array(["🟢", "🟡", "🟠", "🔴"], dtype=object)
+
+# Axes des graphiques radar (une branche par composante du score) ; le premier angle
+# est répété à la fin pour fermer le polygone
+_RADAR_CATEGORIES = [
+    'Fréquence\nModifications',
+    'Présence\nListes',
+    'Type\nChangement',
+    'Récence'
+]
+_RADAR_ANGLES = np.linspace(0, 2 * np.pi, len(_RADAR_CATEGORIES), endpoint=False).tolist()
+_RADAR_ANGLES += _RADAR_ANGLES[:1]
+_RISK_LEVEL_COLORS = {
+    'Critique': '#d32f2f',   # Rouge
+    'Élevé': '#f57c00',      # Orange
+    'Moyen': '#fbc02d',      # Jaune
+    'Faible': '#388e3c'      # Vert
+}
+
+# Parties fixes du calendrier heatmap, construites une seule fois à l'import
+# (go.Figure valide et copie ces dictionnaires, ils ne sont jamais modifiés)
+_WEEKDAY_NAMES = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+# Types de changement détaillés dans le tooltip (ordre de customdata[1:])
+_CALENDAR_CHANGE_TYPES = ['insertion', 'suppression', 'modification']
+# Colorscale personnalisée (blanc → vert clair → vert foncé → rouge)
+_CALENDAR_COLORSCALE = [
+    [0, '#ebedf0'],      # Blanc (0 changements)
+    [0.2, '#c6e48b'],    # Vert très clair
+    [0.4, '#7bc96f'],    # Vert clair
+    [0.6, '#239a3b'],    # Vert moyen
+    [0.8, '#196127'],    # Vert foncé
+    [1.0, '#c41e3a']     # Rouge (très actif)
+]
+_CALENDAR_HOVERTEMPLATE = (
+    "<b>%{customdata[0]}</b><br>"
+    "Total: %{z} changement(s)<br>"
+    "Insertions: %{customdata[1]}<br>"
+    "Suppressions: %{customdata[2]}<br>"
+    "Modifications: %{customdata[3]}<extra></extra>"
+)
+_CALENDAR_COLORBAR = dict(
+    title=dict(text="Changements", side="right"),
+    tickmode="linear",
+    tick0=0
+)
+# Message d'erreur affiché à la place du calendrier (seul le texte varie)
+_CALENDAR_ERROR_ANNOTATION = dict(
+    xref="paper", yref="paper",
+    x=0.5, y=0.5, showarrow=False,
+    font=dict(size=16, color='red')
+)
+_CALENDAR_LAYOUT = dict(
+    xaxis=dict(
+        title="Semaines",
+        side="bottom",
+        tickangle=0,
+        showgrid=False
+    ),
+    yaxis=dict(
+        title="",
+        showgrid=False,
+        autorange="reversed"  # Lundi en haut
+    ),
+    height=400,
+    plot_bgcolor='white',
+    hoverlabel=dict(
+        bgcolor="white",
+        font_size=12,
+        font_family="Arial"
+    )
+)
+
+
+def _bucket_scores(values, edges: np.ndarray, scores: np.ndarray):
+    """
+    Score du palier de chaque valeur (scalaire ou tableau), par recherche dichotomique
+    """
+    return scores[np.searchsorted(edges, values, side='left')]
+
+
+def _as_datetime(values: pd.Series) -> pd.Series:
+    """
+    Convertit une colonne en datetime64, sans nouvelle analyse si elle l'est déjà
+    (historique converti une fois par l'appelant pour toute une liste de substances)
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    return pd.to_datetime(values)
+
+
+def _frame_digest(df: pd.DataFrame, columns: List[str]) -> str:
+    """
+    Empreinte du contenu de quelques colonnes d'un DataFrame (clé de cache indépendante
+    de l'objet : l'historique est relu depuis la base à chaque rafraîchissement de la page)
+    """
+    columns = [col for col in columns if col in df.columns]
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+
+def _scan_history(history_df: pd.DataFrame) -> Tuple[int, object, object]:
+    """
+    Parcourt une seule fois l'historique d'une substance pour en extraire ce dont
+    les composantes du score ont besoin
+
+    Returns:
+        Tuple (nombre de modifications, type du changement le plus récent,
+        timestamp de la première insertion ou None s'il n'y en a pas)
+    """
+    change_types = history_df['change_type']
+    timestamps = history_df['timestamp'].to_numpy()
+
+    modification_count = int(change_types.eq('modification').sum())
+
+    # Position du timestamp le plus récent (argmax, sans trier tout l'historique)
+    valid = np.flatnonzero(pd.notna(timestamps))
+    latest_pos = valid[timestamps[valid].argmax()] if len(valid) else 0
+    latest_change = change_types.iat[latest_pos]
+
+    is_insertion = change_types.eq('insertion').to_numpy(dtype=bool, na_value=False)
+    first_insertion = history_df['timestamp'][is_insertion].min() if is_insertion.any() else None
+
+    return modification_count, latest_change, first_insertion
+
+
 class RiskAnalyzer:
     """Analyseur de risque pour les substances chimiques"""
 
@@ -27,10 +186,133 @@ class RiskAnalyzer:
             'recent_change_type': 0.30,      # Type de changement récent
             'recency': 0.20                  # Ancienneté
         }
+        # Calculs coûteux par DataFrame (positions par CAS ID, dates analysées), mis en cache
+        # seulement dans un bloc frame_cache() et pour le thread courant (voir frame_cache)
+        self._local = threading.local()
+        # Calendriers déjà générés (dictionnaires des figures), par (année, filtres,
+        # empreinte de l'historique)
+        self._calendar_cache = {}
+        self._calendar_lock = threading.Lock()
         logger.info("RiskAnalyzer initialisé")
 
+    @contextmanager
+    def frame_cache(self):
+        """
+        Bloc dans lequel les calculs coûteux par DataFrame sont faits une seule fois
+
+        À utiliser autour des boucles qui appellent les méthodes par substance sur les mêmes
+        DataFrames (les DataFrames ne doivent pas être modifiés pendant le bloc). Le cache est
+        propre au thread courant (l'analyseur est partagé entre les sessions) et vidé à la
+        sortie du bloc le plus externe : aucun DataFrame n'est conservé au-delà.
+        """
+        outermost = getattr(self._local, 'frames', None) is None
+        if outermost:
+            self._local.frames = {}
+        try:
+            yield self
+        finally:
+            if outermost:
+                self._local.frames = None
+
+    def _cached_for_frame(self, df: pd.DataFrame, name: str, build):
+        """
+        Retourne build(df), calculé une seule fois par DataFrame dans un bloc frame_cache()
+        (recalculé à chaque appel en dehors d'un tel bloc)
+
+        L'entrée garde une référence au DataFrame : son id ne peut pas être réutilisé
+        pendant le bloc.
+        """
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            return build(df)
+        key = (id(df), name)
+        cached = frames.get(key)
+        if cached is None or cached[0] is not df:
+            cached = (df, build(df))
+            frames[key] = cached
+        return cached[1]
+
+    def _substance_positions(self, df: pd.DataFrame, cas_id: str) -> np.ndarray:
+        """
+        Positions des lignes de df pour un CAS ID
+
+        Dans un bloc frame_cache(), le dictionnaire {cas_id: positions} est construit une
+        seule fois par DataFrame : les appels répétés sur les mêmes données (boucles sur une
+        liste de substances) ne refont pas un balayage complet de la colonne cas_id.
+        """
+        if getattr(self._local, 'frames', None) is None:
+            return np.flatnonzero(df['cas_id'].eq(cas_id).to_numpy(dtype=bool, na_value=False))
+        positions = self._cached_for_frame(
+            df, 'cas_positions', lambda d: d.groupby('cas_id', sort=False).indices
+        ).get(cas_id)
+        if positions is None:
+            return np.empty(0, dtype=np.intp)
+        return positions
+
+    def _substance_rows(self, df: pd.DataFrame, cas_id: str) -> pd.DataFrame:
+        """Retourne les lignes de df pour un CAS ID"""
+        return df.iloc[self._substance_positions(df, cas_id)]
+
+    def _substance_history(self, history_df: pd.DataFrame, cas_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Timestamps (datetime64, triés) et types de changement (même ordre) d'une substance
+
+        Mis en cache par DataFrame et par CAS ID dans un bloc frame_cache() : la prédiction et
+        la détection d'anomalies d'une même substance ne refont ni la sélection ni le tri
+        de son historique.
+        """
+        per_cas = self._cached_for_frame(history_df, 'substance_history', lambda d: {})
+        arrays = per_cas.get(cas_id)
+        if arrays is None:
+            positions = self._substance_positions(history_df, cas_id)
+            timestamps = self._ensure_datetime(history_df).to_numpy()[positions]
+            order = np.argsort(timestamps, kind='stable')
+            if 'change_type' in history_df.columns:
+                change_types = history_df['change_type'].iloc[positions].to_numpy(dtype=object, na_value=None)
+            else:
+                change_types = np.full(len(positions), None, dtype=object)
+            arrays = (timestamps[order], change_types[order])
+            per_cas[cas_id] = arrays
+        return arrays
+
+    def _ensure_datetime(self, df: pd.DataFrame, column: str = 'timestamp') -> pd.Series:
+        """
+        Colonne de dates de df en datetime64, analysée une seule fois par DataFrame dans un
+        bloc frame_cache() (le DataFrame de l'appelant n'est pas modifié)
+        """
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            return df[column]
+        return self._cached_for_frame(df, f'datetime:{column}', lambda d: pd.to_datetime(d[column]))
+
+    def _calendar_parts(self, history_df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Année, jour de l'année (0 = 1er janvier) et code du type de changement de chaque
+        ligne de l'historique (position dans _CALENDAR_CHANGE_TYPES, -1 pour les autres)
+
+        Calculé une seule fois par DataFrame dans un bloc frame_cache() : le calendrier de
+        chaque année et de chaque filtre sur le même historique ne réanalyse pas les timestamps.
+        """
+        def build(df):
+            timestamps = self._ensure_datetime(df).dt
+            years = timestamps.year.to_numpy(dtype=np.int64, na_value=0)
+            days = timestamps.dayofyear.to_numpy(dtype=np.int64, na_value=0) - 1
+            type_codes = pd.Categorical(df['change_type'], categories=_CALENDAR_CHANGE_TYPES).codes
+            return years, days, type_codes.astype(np.intp)
+
+        return self._cached_for_frame(history_df, 'calendar_parts', build)
+
+    def _calendar_digest(self, history_df: pd.DataFrame) -> str:
+        """
+        Empreinte des colonnes de l'historique utilisées par le calendrier (clé du cache des
+        figures), calculée une seule fois par DataFrame dans un bloc frame_cache()
+        """
+        return self._cached_for_frame(
+            history_df, 'calendar_digest',
+            lambda d: _frame_digest(d, ['timestamp', 'source_list', 'change_type'])
+        )
+
     def calculate_risk_score(self, cas_id: str, aggregated_df: pd.DataFrame,
-                            history_df: pd.DataFrame) -> Dict:
+                            history_df: pd.DataFrame, now: Optional[datetime] = None) -> Dict:
         """
         Calcule le score de risque pour une substance
 
@@ -38,88 +320,90 @@ class RiskAnalyzer:
             cas_id: CAS ID de la substance
             aggregated_df: DataFrame des données agrégées
             history_df: DataFrame de l'historique des changements
+            now: Date de référence pour l'ancienneté (défaut: datetime.now()) ;
+                 à calculer une fois par l'appelant qui boucle sur plusieurs substances
 
         Returns:
             Dictionnaire avec le score et les détails
         """
         try:
-            # Filtrer les données pour cette substance
-            substance_data = aggregated_df[aggregated_df['cas_id'] == cas_id]
+            return self._calculate_risk_score_unsafe(cas_id, aggregated_df, history_df, now)
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul du score pour {cas_id}: {e}", exc_info=True)
+            return self._default_score()
 
-            # Gérer le cas d'un historique vide
-            if history_df.empty or 'cas_id' not in history_df.columns:
-                substance_history = pd.DataFrame()
-            else:
-                substance_history = history_df[history_df['cas_id'] == cas_id].copy()
+    def _calculate_risk_score_unsafe(self, cas_id: str, aggregated_df: pd.DataFrame,
+                                     history_df: pd.DataFrame, now: Optional[datetime] = None) -> Dict:
+        """
+        Corps de calculate_risk_score, sans try/except : les erreurs remontent à l'appelant
+        (qui a déjà validé les données ou se charge de les journaliser)
+        """
+        # Filtrer les données pour cette substance
+        substance_data = self._substance_rows(aggregated_df, cas_id)
 
-            if substance_data.empty:
-                logger.warning(f"Aucune donnée trouvée pour CAS ID: {cas_id}")
-                return self._default_score()
-
-            # Calcul des composantes du score
-            mod_freq_score = self._calculate_modification_frequency_score(substance_history)
-            list_presence_score = self._calculate_list_presence_score(substance_data)
-            recent_change_score = self._calculate_recent_change_score(substance_history)
-            recency_score = self._calculate_recency_score(substance_data, substance_history)
-
-            # Score total (pondéré)
-            total_score = (
-                mod_freq_score * self.weights['modification_frequency'] +
-                list_presence_score * self.weights['list_presence'] +
-                recent_change_score * self.weights['recent_change_type'] +
-                recency_score * self.weights['recency']
-            )
+        # Gérer le cas d'un historique vide
+        if history_df.empty or 'cas_id' not in history_df.columns:
+            substance_history = pd.DataFrame()
+        else:
+            substance_history = self._substance_rows(history_df, cas_id)
+
+        if substance_data.empty:
+            logger.warning(f"Aucune donnée trouvée pour CAS ID: {cas_id}")
+            return self._default_score()
 
-            # Déterminer le niveau et le badge
-            level, badge = self._get_risk_level(total_score)
+        # Calcul des composantes du score : un seul parcours de l'historique
+        # (sans historique, les composantes liées aux changements valent 0)
+        if substance_history.empty:
+            mod_freq_score = recent_change_score = 0.0
+            first_insertion = None
+        else:
+            modification_count, latest_change, first_insertion = _scan_history(substance_history)
+            mod_freq_score = self._calculate_modification_frequency_score(modification_count)
+            recent_change_score = self._calculate_recent_change_score(latest_change)
+        list_presence_score = self._calculate_list_presence_score(substance_data)
+        recency_score = self._calculate_recency_score(substance_data, first_insertion, now)
+
+        # Score total (pondéré)
+        total_score = (
+            mod_freq_score * self.weights['modification_frequency'] +
+            list_presence_score * self.weights['list_presence'] +
+            recent_change_score * self.weights['recent_change_type'] +
+            recency_score * self.weights['recency']
+        )
 
-            result = {
-                'cas_id': cas_id,
-                'total_score': round(total_score, 2),
-                'level': level,
-                'badge': badge,
-                'components': {
-                    'modification_frequency': round(mod_freq_score, 2),
-                    'list_presence': round(list_presence_score, 2),
-                    'recent_change_type': round(recent_change_score, 2),
-                    'recency': round(recency_score, 2)
-                },
-                'metadata': {
-                    'total_modifications': len(substance_history),
-                    'lists_count': len(substance_data),
-                    'last_change': substance_history['timestamp'].max() if not substance_history.empty else None
-                }
+        # Déterminer le niveau et le badge
+        level, badge = self._get_risk_level(total_score)
+
+        result = {
+            'cas_id': cas_id,
+            'total_score': round(total_score, 2),
+            'level': level,
+            'badge': badge,
+            'components': {
+                'modification_frequency': round(mod_freq_score, 2),
+                'list_presence': round(list_presence_score, 2),
+                'recent_change_type': round(recent_change_score, 2),
+                'recency': round(recency_score, 2)
+            },
+            'metadata': {
+                'total_modifications': len(substance_history),
+                'lists_count': len(substance_data),
+                'last_change': substance_history['timestamp'].max() if not substance_history.empty else None
             }
+        }
 
-            logger.debug(f"Score calculé pour {cas_id}: {total_score} ({level})")
-            return result
+        logger.debug(f"Score calculé pour {cas_id}: {total_score} ({level})")
+        return result
 
-        except Exception as e:
-            logger.error(f"Erreur lors du calcul du score pour {cas_id}: {e}", exc_info=True)
-            return self._default_score()
 
-    def _calculate_modification_frequency_score(self, history_df: pd.DataFrame) -> float:
+    def _calculate_modification_frequency_score(self, modification_count: int) -> float:
         """
         Calcule le score basé sur la fréquence de modification
 
         Plus il y a de modifications, plus le score est élevé
         """
-        if history_df.empty:
-            return 0.0
-
-        modification_count = len(history_df[history_df['change_type'] == 'modification'])
-
         # Échelle: 0 modif = 0, 1-2 modifs = 25, 3-5 modifs = 50, 6-10 modifs = 75, 10+ = 100
-        if modification_count == 0:
-            return 0.0
-        elif modification_count <= 2:
-            return 25.0
-        elif modification_count <= 5:
-            return 50.0
-        elif modification_count <= 10:
-            return 75.0
-        else:
-            return 100.0
+        return float(_bucket_scores(modification_count, _MOD_FREQ_EDGES, _MOD_FREQ_SCORES))
 
     def _calculate_list_presence_score(self, substance_df: pd.DataFrame) -> float:
         """
@@ -130,38 +414,18 @@ class RiskAnalyzer:
         lists_count = len(substance_df)
 
         # Échelle: 1 liste = 25, 2 listes = 50, 3 listes = 75, 4+ listes = 100
-        if lists_count == 1:
-            return 25.0
-        elif lists_count == 2:
-            return 50.0
-        elif lists_count == 3:
-            return 75.0
-        else:
-            return 100.0
+        return float(_bucket_scores(lists_count, _LIST_PRESENCE_EDGES, _LIST_PRESENCE_SCORES))
 
-    def _calculate_recent_change_score(self, history_df: pd.DataFrame) -> float:
+    def _calculate_recent_change_score(self, latest_change) -> float:
         """
         Calcule le score basé sur le type de changement le plus récent
 
         Suppression = critique, Modification = élevé, Insertion = moyen
         """
-        if history_df.empty:
-            return 0.0
-
-        # Trier par timestamp décroissant
-        history_sorted = history_df.sort_values('timestamp', ascending=False)
-        latest_change = history_sorted.iloc[0]['change_type']
-
-        change_scores = {
-            'suppression': 100.0,
-            'modification': 60.0,
-            'insertion': 30.0
-        }
+        return _CHANGE_TYPE_SCORES.get(latest_change, 0.0)
 
-        return change_scores.get(latest_change, 0.0)
-
-    def _calculate_recency_score(self, substance_df: pd.DataFrame,
-                                 history_df: pd.DataFrame) -> float:
+    def _calculate_recency_score(self, substance_df: pd.DataFrame, first_insertion,
+                                 now: Optional[datetime] = None) -> float:
         """
         Calcule le score basé sur l'ancienneté de la substance
 
@@ -170,32 +434,22 @@ class RiskAnalyzer:
         try:
             # Utiliser created_at si disponible
             if 'created_at' in substance_df.columns:
-                created_dates = pd.to_datetime(substance_df['created_at'])
+                created_dates = _as_datetime(substance_df['created_at'])
                 oldest_date = created_dates.min()
-            elif not history_df.empty:
+            elif first_insertion is not None:
                 # Sinon utiliser la date de première insertion dans l'historique
-                insertions = history_df[history_df['change_type'] == 'insertion']
-                if not insertions.empty:
-                    oldest_date = pd.to_datetime(insertions['timestamp'].min())
-                else:
-                    return 50.0  # Score moyen par défaut
+                oldest_date = pd.to_datetime(first_insertion)
             else:
-                return 50.0
+                return 50.0  # Score moyen par défaut
 
             # Calculer l'âge en jours
-            age_days = (datetime.now() - oldest_date).days
+            if now is None:
+                now = datetime.now()
+            age_days = (now - oldest_date).days
 
             # Échelle: 0-7 jours = 100, 8-30 jours = 75, 31-90 jours = 50, 91-365 jours = 25, 365+ = 0
-            if age_days <= 7:
-                return 100.0
-            elif age_days <= 30:
-                return 75.0
-            elif age_days <= 90:
-                return 50.0
-            elif age_days <= 365:
-                return 25.0
-            else:
-                return 0.0
+            # (âge inconnu : NaN classé après la dernière borne, donc 0)
+            return float(_bucket_scores(age_days, _RECENCY_EDGES, _RECENCY_SCORES))
 
         except Exception as e:
             logger.warning(f"Erreur lors du calcul du score de récence: {e}")
@@ -220,6 +474,13 @@ class RiskAnalyzer:
         else:
             return "Faible", "🟢"
 
+    def _get_risk_levels(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Version vectorisée de _get_risk_level : niveaux et badges d'un tableau de scores
+        """
+        idx = np.searchsorted(_RISK_LEVEL_THRESHOLDS, scores, side='right')
+        return _RISK_LEVELS[idx], _RISK_BADGES[idx]
+
     def _default_score(self) -> Dict:
         """Retourne un score par défaut en cas d'erreur"""
         return {
@@ -253,21 +514,166 @@ class RiskAnalyzer:
         Returns:
             DataFrame avec les scores
         """
-        scores = []
-        for cas_id in cas_ids:
-            score = self.calculate_risk_score(cas_id, aggregated_df, history_df)
-            scores.append(score)
+        batch = self._score_batch(cas_ids, aggregated_df, history_df)
+        scores_df = self._scores_frame(batch, range(len(batch['cas_id'])))
+
+        logger.info(f"Scores calculés pour {len(scores_df)} substances")
+        return scores_df
+
+    def _score_batch(self, cas_ids: List[str], aggregated_df: pd.DataFrame,
+                     history_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Calcule les composantes et le score total de plusieurs CAS IDs sous forme de tableaux
+
+        Calcul vectorisé : un seul groupby par DataFrame au lieu d'un filtrage
+        complet de aggregated_df et history_df pour chaque CAS ID.
+        Les substances absentes de aggregated_df ont un score total de 0.
+        """
+        ids = pd.Index(cas_ids)
+        lists_count = aggregated_df.groupby('cas_id').size().reindex(ids, fill_value=0).to_numpy()
+
+        has_history = history_df is not None and not history_df.empty and 'cas_id' in history_df.columns
+        if has_history:
+            hist = history_df[history_df['cas_id'].isin(ids)]
+            # change_type en catégorie : les comparaisons portent sur des codes entiers
+            if not isinstance(hist['change_type'].dtype, pd.CategoricalDtype):
+                hist = hist.assign(change_type=hist['change_type'].astype('category'))
+            # Métadonnées et nombre de modifications en un seul groupby
+            meta = (hist.assign(is_modification=hist['change_type'].eq('modification'))
+                    .groupby('cas_id')
+                    .agg(total_modifications=('change_type', 'size'),
+                         modification_count=('is_modification', 'sum'),
+                         last_change=('timestamp', 'max'))
+                    .reindex(ids))
+            history_count = meta['total_modifications'].fillna(0).to_numpy(dtype=np.int64)
+            mod_count = meta['modification_count'].fillna(0).to_numpy(dtype=np.int64)
+            last_change = meta['last_change']
+            # Dernier changement de chaque substance : tri stable décroissant (timestamps
+            # manquants en fin), la première ligne parmi des timestamps égaux est retenue,
+            # comme dans _scan_history (changements d'une même mise à jour sur plusieurs listes)
+            latest = (hist.sort_values('timestamp', ascending=False, kind='stable', na_position='last')
+                      .drop_duplicates('cas_id', keep='first')
+                      .set_index('cas_id'))
+            latest_type = latest['change_type'].reindex(ids)
+        else:
+            history_count = np.zeros(len(ids), dtype=np.int64)
+            mod_count = history_count
+            latest_type = pd.Series(np.nan, index=ids, dtype=object)
+            last_change = latest_type
+
+        mod_freq_scores = _bucket_scores(mod_count, _MOD_FREQ_EDGES, _MOD_FREQ_SCORES)
+        list_presence_scores = _bucket_scores(lists_count, _LIST_PRESENCE_EDGES, _LIST_PRESENCE_SCORES)
+        # astype(float) : sur une catégorie, map renvoie une catégorie (fillna(0.0) impossible)
+        recent_change_scores = latest_type.map(_CHANGE_TYPE_SCORES).astype(float).fillna(0.0).to_numpy()
+        recency_scores = self._recency_scores(ids, aggregated_df, hist if has_history else None)
+
+        total_scores = (
+            mod_freq_scores * self.weights['modification_frequency'] +
+            list_presence_scores * self.weights['list_presence'] +
+            recent_change_scores * self.weights['recent_change_type'] +
+            recency_scores * self.weights['recency']
+        )
+
+        found = lists_count > 0
+        for cas_id in ids[~found]:
+            logger.warning(f"Aucune donnée trouvée pour CAS ID: {cas_id}")
+
+        return {
+            'cas_id': ids.to_numpy(),
+            'found': found,
+            'total_score': np.where(found, total_scores, 0.0),
+            'modification_frequency': mod_freq_scores,
+            'list_presence': list_presence_scores,
+            'recent_change_type': recent_change_scores,
+            'recency': recency_scores,
+            'history_count': history_count,
+            'lists_count': lists_count,
+            'last_change': last_change.to_numpy(dtype=object),
+        }
 
-        logger.info(f"Scores calculés pour {len(scores)} substances")
-        return pd.DataFrame(scores)
+    def _scores_frame(self, batch: Dict[str, np.ndarray], positions, index=None) -> pd.DataFrame:
+        """
+        Construit le DataFrame des scores (même format que calculate_risk_score)
+        pour les positions demandées du résultat de _score_batch
+        """
+        # Construction colonne par colonne : pas d'inférence de schéma sur N dictionnaires
+        positions = np.asarray(positions, dtype=np.intp)
+        n = len(positions)
+        found = batch['found'][positions]
+        default = self._default_score()
+
+        cas_col = np.where(found, batch['cas_id'][positions], default['cas_id'])
+        total_col = np.round(batch['total_score'][positions], 2)
+        # Score 0 pour les substances inconnues : niveau et badge du score par défaut
+        level_col, badge_col = self._get_risk_levels(batch['total_score'][positions])
+        components_col = np.empty(n, dtype=object)
+        metadata_col = np.empty(n, dtype=object)
+
+        for k, i in enumerate(positions):
+            if not found[k]:
+                components_col[k] = dict(default['components'])
+                metadata_col[k] = dict(default['metadata'])
+                continue
+
+            components_col[k] = {
+                'modification_frequency': round(float(batch['modification_frequency'][i]), 2),
+                'list_presence': round(float(batch['list_presence'][i]), 2),
+                'recent_change_type': round(float(batch['recent_change_type'][i]), 2),
+                'recency': round(float(batch['recency'][i]), 2)
+            }
+            metadata_col[k] = {
+                'total_modifications': int(batch['history_count'][i]),
+                'lists_count': int(batch['lists_count'][i]),
+                'last_change': batch['last_change'][i] if batch['history_count'][i] else None
+            }
 
-    def predict_next_change(self, cas_id: str, history_df: pd.DataFrame) -> Dict:
+        return pd.DataFrame({
+            'cas_id': cas_col,
+            'total_score': total_col,
+            'level': level_col,
+            'badge': badge_col,
+            'components': components_col,
+            'metadata': metadata_col,
+        }, index=index)
+
+    def _recency_scores(self, ids: pd.Index, aggregated_df: pd.DataFrame,
+                        history_df: Optional[pd.DataFrame]) -> np.ndarray:
+        """
+        Version vectorisée de _calculate_recency_score pour plusieurs CAS IDs
+        """
+        if 'created_at' in aggregated_df.columns:
+            raw = aggregated_df['created_at']
+            created = pd.to_datetime(raw, errors='coerce')
+            oldest = created.groupby(aggregated_df['cas_id']).min().reindex(ids)
+            # Dates non interprétables : score moyen, comme dans _calculate_recency_score
+            invalid = (created.isna() & raw.notna()).groupby(aggregated_df['cas_id']).any()
+            invalid = invalid.reindex(ids, fill_value=False).to_numpy()
+            missing_score = 0.0
+        elif history_df is not None:
+            insertions = history_df[history_df['change_type'] == 'insertion']
+            oldest = pd.to_datetime(insertions.groupby('cas_id')['timestamp'].min()).reindex(ids)
+            invalid = np.zeros(len(ids), dtype=bool)
+            missing_score = 50.0
+        else:
+            return np.full(len(ids), 50.0)
+
+        # Âge en jours entiers (comme Timedelta.days), calculé sur le tableau datetime64 ;
+        # NaN pour les dates manquantes
+        now = np.datetime64(datetime.now(), 'ns')
+        age_days = np.floor((now - oldest.to_numpy(dtype='datetime64[ns]')) / np.timedelta64(1, 'D'))
+        scores = np.where(np.isnan(age_days), missing_score,
+                          _bucket_scores(age_days, _RECENCY_EDGES, _RECENCY_SCORES))
+        return np.where(invalid, 50.0, scores)
+
+    def predict_next_change(self, cas_id: str, history_df: pd.DataFrame,
+                            now: Optional[datetime] = None) -> Dict:
         """
         Prédit le prochain changement probable pour une substance
 
         Args:
             cas_id: CAS ID de la substance
             history_df: DataFrame de l'historique
+            now: Date de référence pour l'imminence (défaut: datetime.now())
 
         Returns:
             Dictionnaire avec la prédiction
@@ -275,11 +681,11 @@ class RiskAnalyzer:
         try:
             # Gérer le cas d'un historique vide
             if history_df.empty or 'cas_id' not in history_df.columns:
-                substance_history = pd.DataFrame()
+                positions = np.empty(0, dtype=np.intp)
             else:
-                substance_history = history_df[history_df['cas_id'] == cas_id].copy()
+                positions = self._substance_positions(history_df, cas_id)
 
-            if substance_history.empty or len(substance_history) < 2:
+            if len(positions) < 2:
                 return {
                     'prediction': 'Données insuffisantes',
                     'confidence': 'Faible',
@@ -287,18 +693,23 @@ class RiskAnalyzer:
                     'average_interval_days': None
                 }
 
-            # Convertir les timestamps et trier
-            substance_history['timestamp'] = pd.to_datetime(substance_history['timestamp'])
-            substance_history = substance_history.sort_values('timestamp')
+            # Timestamps triés de la substance (partagés avec detect_anomalies)
+            timestamps, _ = self._substance_history(history_df, cas_id)
 
-            # Calculer les intervalles entre changements
-            timestamps = substance_history['timestamp'].values
-            intervals = []
-            for i in range(1, len(timestamps)):
-                delta = pd.Timestamp(timestamps[i]) - pd.Timestamp(timestamps[i-1])
-                intervals.append(delta.days)
+            if np.isnat(timestamps[-1]):
+                # Timestamp manquant (trié en dernier) : pas de date de prédiction possible
+                logger.warning(f"Timestamp manquant dans l'historique de {cas_id}, prédiction impossible")
+                return {
+                    'prediction': 'Erreur',
+                    'confidence': 'Faible',
+                    'estimated_date': None,
+                    'average_interval_days': None
+                }
+
+            # Calculer les intervalles entre changements (en jours entiers)
+            intervals = np.diff(timestamps) // np.timedelta64(1, 'D')
 
-            if not intervals:
+            if len(intervals) == 0:
                 return {
                     'prediction': 'Données insuffisantes',
                     'confidence': 'Faible',
@@ -307,9 +718,8 @@ class RiskAnalyzer:
                 }
 
             # Calculer l'intervalle moyen
-            avg_interval_days = sum(intervals) / len(intervals)
-            last_change = pd.Timestamp(timestamps[-1])
-            predicted_next = last_change + timedelta(days=avg_interval_days)
+            avg_interval_days = float(intervals.mean())
+            predicted_next = timestamps[-1] + np.timedelta64(timedelta(days=avg_interval_days))
 
             # Déterminer la confiance
             if len(intervals) >= 3:
@@ -319,14 +729,15 @@ class RiskAnalyzer:
             else:
                 confidence = "Faible"
 
-            # Vérifier si changement imminent
-            days_until_predicted = (predicted_next - datetime.now()).days
+            # Vérifier si changement imminent (calcul en datetime64, heure locale comme datetime.now())
+            now = np.datetime64(now if now is not None else datetime.now(), 'ns')
+            days_until_predicted = int((predicted_next - now) // np.timedelta64(1, 'D'))
             is_imminent = days_until_predicted <= 30
 
             result = {
                 'prediction': f"Changement prévu dans ~{int(avg_interval_days)} jours",
                 'confidence': confidence,
-                'estimated_date': predicted_next.strftime('%Y-%m-%d'),
+                'estimated_date': str(predicted_next.astype('datetime64[D]')),
                 'average_interval_days': int(avg_interval_days),
                 'is_imminent': is_imminent,
                 'days_until_predicted': days_until_predicted
@@ -358,43 +769,40 @@ class RiskAnalyzer:
         try:
             # Gérer le cas d'un historique vide
             if history_df.empty or 'cas_id' not in history_df.columns:
-                substance_history = pd.DataFrame()
+                positions = np.empty(0, dtype=np.intp)
             else:
-                substance_history = history_df[history_df['cas_id'] == cas_id].copy()
+                positions = self._substance_positions(history_df, cas_id)
 
-            if substance_history.empty or len(substance_history) < 3:
+            if len(positions) < 3:
                 return {
                     'has_anomaly': False,
                     'anomaly_type': None,
                     'description': 'Historique insuffisant pour détecter des anomalies'
                 }
 
-            # Convertir les timestamps
-            substance_history['timestamp'] = pd.to_datetime(substance_history['timestamp'])
-            substance_history = substance_history.sort_values('timestamp')
-
-            # Calculer les intervalles
-            timestamps = substance_history['timestamp'].values
-            intervals = []
-            for i in range(1, len(timestamps)):
-                delta = pd.Timestamp(timestamps[i]) - pd.Timestamp(timestamps[i-1])
-                intervals.append(delta.days)
-
-            avg_interval = sum(intervals) / len(intervals)
-            last_interval = intervals[-1]
-
-            # Détecter anomalie: dernier intervalle < 50% de la moyenne
-            if last_interval < avg_interval * 0.5 and avg_interval > 7:
-                return {
-                    'has_anomaly': True,
-                    'anomaly_type': 'Changement inhabituel',
-                    'description': f'Changement détecté après seulement {last_interval} jours (moyenne: {int(avg_interval)} jours)',
-                    'badge': '⚠️'
-                }
+            # Timestamps triés de la substance et types de changement dans le même ordre
+            timestamps, change_types = self._substance_history(history_df, cas_id)
+
+            # Timestamp manquant (trié en dernier) : intervalles indéfinis, seule la règle
+            # des suppressions s'applique
+            if not np.isnat(timestamps[-1]):
+                # Calculer les intervalles (en jours entiers)
+                intervals = np.diff(timestamps) // np.timedelta64(1, 'D')
+
+                avg_interval = float(intervals.mean())
+                last_interval = int(intervals[-1])
+
+                # Détecter anomalie: dernier intervalle < 50% de la moyenne
+                if last_interval < avg_interval * 0.5 and avg_interval > 7:
+                    return {
+                        'has_anomaly': True,
+                        'anomaly_type': 'Changement inhabituel',
+                        'description': f'Changement détecté après seulement {last_interval} jours (moyenne: {int(avg_interval)} jours)',
+                        'badge': '⚠️'
+                    }
 
             # Détecter anomalie: suppressions fréquentes
-            recent_changes = substance_history.tail(5)
-            suppression_count = len(recent_changes[recent_changes['change_type'] == 'suppression'])
+            suppression_count = int((change_types[-5:] == 'suppression').sum())
             if suppression_count >= 2:
                 return {
                     'has_anomaly': True,
@@ -417,6 +825,94 @@ class RiskAnalyzer:
                 'description': 'Erreur lors de l\'analyse'
             }
 
+    def detect_anomalies_bulk(self, cas_ids: List[str], history_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Version vectorisée de detect_anomalies pour plusieurs CAS IDs
+
+        L'historique des substances demandées est trié une seule fois (par substance puis
+        par date) ; intervalles moyens, derniers intervalles et suppressions récentes sont
+        obtenus par des réductions NumPy groupées (np.bincount).
+
+        Args:
+            cas_ids: Liste des CAS IDs
+            history_df: DataFrame de l'historique
+
+        Returns:
+            DataFrame indexé par cas_id (une ligne par CAS ID demandé, dans l'ordre) avec les
+            colonnes has_anomaly, anomaly_type, description et badge
+        """
+        ids = pd.Index(cas_ids).unique()
+        has_anomaly = np.zeros(len(ids), dtype=bool)
+        anomaly_type = np.full(len(ids), None, dtype=object)
+        description = np.full(len(ids), 'Historique insuffisant pour détecter des anomalies', dtype=object)
+        badge = np.full(len(ids), None, dtype=object)
+
+        if not history_df.empty and 'cas_id' in history_df.columns and len(ids):
+            try:
+                # Lignes des substances demandées, triées par substance puis par date
+                # (tri stable : même ordre que detect_anomalies pour des dates égales)
+                positions = np.flatnonzero(history_df['cas_id'].isin(ids).to_numpy(dtype=bool, na_value=False))
+                codes = ids.get_indexer(history_df['cas_id'].iloc[positions])
+                timestamps = self._ensure_datetime(history_df).to_numpy()[positions]
+                change_types = history_df['change_type'].iloc[positions].to_numpy(dtype=object, na_value=None)
+                order = np.lexsort((timestamps, codes))
+                codes, timestamps, change_types = codes[order], timestamps[order], change_types[order]
+
+                sizes = np.bincount(codes, minlength=len(ids))
+                ends = np.cumsum(sizes)
+                enough = sizes >= 3
+                # Substances avec un timestamp manquant : intervalles indéfinis (cf. detect_anomalies)
+                has_nat = np.bincount(codes, weights=np.isnat(timestamps), minlength=len(ids)) > 0
+
+                # Intervalles (en jours entiers) entre changements consécutifs d'une même substance
+                with np.errstate(invalid='ignore'):
+                    intervals = np.diff(timestamps) // np.timedelta64(1, 'D')
+                same = codes[1:] == codes[:-1]
+                avg_interval = (np.bincount(codes[1:][same], weights=intervals[same], minlength=len(ids))
+                                / np.maximum(sizes - 1, 1))
+                last_interval = np.zeros(len(ids), dtype=np.int64)
+                last_interval[enough] = intervals[ends[enough] - 2]
+
+                # Suppressions parmi les 5 derniers changements de chaque substance
+                recent = (ends[codes] - np.arange(len(codes))) <= 5
+                suppression_count = np.bincount(
+                    codes, weights=recent & (change_types == 'suppression'), minlength=len(ids)
+                ).astype(np.int64)
+
+                # Mêmes règles que detect_anomalies, dans le même ordre de priorité
+                unusual = enough & ~has_nat & (last_interval < avg_interval * 0.5) & (avg_interval > 7)
+                frequent = enough & ~unusual & (suppression_count >= 2)
+
+                description[enough] = 'Aucune anomalie détectée'
+                for i in np.flatnonzero(unusual):
+                    description[i] = (f'Changement détecté après seulement {last_interval[i]} jours '
+                                      f'(moyenne: {int(avg_interval[i])} jours)')
+                for i in np.flatnonzero(frequent):
+                    description[i] = f'{suppression_count[i]} suppressions dans les 5 derniers changements'
+                has_anomaly = unusual | frequent
+                anomaly_type[unusual] = 'Changement inhabituel'
+                anomaly_type[frequent] = 'Suppressions fréquentes'
+                badge[has_anomaly] = '⚠️'
+
+            except Exception as e:
+                logger.error(f"Erreur lors de la détection d'anomalies groupée: {e}", exc_info=True)
+                # Repli sur l'analyse substance par substance
+                with self.frame_cache():
+                    rows = [self.detect_anomalies(cas_id, history_df) for cas_id in ids]
+                has_anomaly = np.array([row['has_anomaly'] for row in rows], dtype=bool)
+                anomaly_type = np.array([row['anomaly_type'] for row in rows], dtype=object)
+                description = np.array([row['description'] for row in rows], dtype=object)
+                badge = np.array([row.get('badge') for row in rows], dtype=object)
+
+        anomalies = pd.DataFrame({
+            'has_anomaly': has_anomaly,
+            'anomaly_type': anomaly_type,
+            'description': description,
+            'badge': badge,
+        }, index=ids)
+        anomalies.index.name = 'cas_id'
+        return anomalies.reindex(pd.Index(cas_ids, name='cas_id'))
+
     def get_top_risk_substances(self, cas_ids: List[str], aggregated_df: pd.DataFrame,
                                history_df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
         """
@@ -431,12 +927,26 @@ class RiskAnalyzer:
         Returns:
             DataFrame trié par score décroissant
         """
-        scores_df = self.calculate_scores_for_watchlist(cas_ids, aggregated_df, history_df)
-        top_risks = scores_df.nlargest(top_n, 'total_score')
+        batch = self._score_batch(cas_ids, aggregated_df, history_df)
+
+        # Sélection partielle (argpartition) des top_n scores, puis tri de ces seuls candidats ;
+        # à score égal, la première substance de la liste passe devant (comme nlargest)
+        scores = np.round(batch['total_score'], 2)
+        n = len(scores)
+        top_n = max(min(top_n, n), 0)
+        if 0 < top_n < n:
+            threshold = np.partition(scores, n - top_n)[n - top_n]
+            candidates = np.flatnonzero(scores >= threshold)
+        else:
+            candidates = np.arange(n)
+        top_positions = candidates[np.argsort(-scores[candidates], kind='stable')][:top_n]
+
+        # DataFrame construit uniquement pour les substances retenues
+        top_risks = self._scores_frame(batch, top_positions, index=top_positions)
         logger.info(f"Top {top_n} substances à risque identifiées")
         return top_risks
 
-    def generate_radar_chart(self, score_data: Dict, cas_name: str = None) -> plt.Figure:
+    def generate_radar_chart(self, score_data: Dict, cas_name: str = None) -> 'matplotlib.figure.Figure':
         """
         Génère un graphique radar pour visualiser les 4 composantes du score de risque
 
@@ -450,12 +960,7 @@ class RiskAnalyzer:
         try:
             # Extraire les composantes du score
             components = score_data['components']
-            categories = [
-                'Fréquence\nModifications',
-                'Présence\nListes',
-                'Type\nChangement',
-                'Récence'
-            ]
+            categories = _RADAR_CATEGORIES
             values = [
                 components['modification_frequency'],
                 components['list_presence'],
@@ -463,28 +968,20 @@ class RiskAnalyzer:
                 components['recency']
             ]
 
-            # Nombre de variables
+            # Nombre de variables et angles de chaque axe (précalculés)
             num_vars = len(categories)
-
-            # Calculer les angles pour chaque axe
-            angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
+            angles = _RADAR_ANGLES
 
             # Fermer le polygone
             values += values[:1]
-            angles += angles[:1]
 
             # Créer la figure
-            fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(projection='polar'))
+            fig = _new_figure((8, 8))
+            ax = fig.add_subplot(projection='polar')
 
             # Définir la couleur selon le niveau de risque
             level = score_data['level']
-            colors = {
-                'Critique': '#d32f2f',   # Rouge
-                'Élevé': '#f57c00',      # Orange
-                'Moyen': '#fbc02d',      # Jaune
-                'Faible': '#388e3c'      # Vert
-            }
-            color = colors.get(level, '#1976d2')
+            color = _RISK_LEVEL_COLORS.get(level, '#1976d2')
 
             # Tracer le polygone
             ax.plot(angles, values, 'o-', linewidth=2, color=color, label=f'Score: {score_data["total_score"]}')
@@ -509,7 +1006,7 @@ class RiskAnalyzer:
                 title += f"\n{cas_name}"
             title += f"\nScore Total: {score_data['total_score']} - {score_data['badge']} {level}"
 
-            plt.title(title, size=14, pad=20, weight='bold')
+            ax.set_title(title, size=14, pad=20, weight='bold')
 
             # Légende avec les valeurs
             legend_text = '\n'.join([
@@ -523,7 +1020,8 @@ class RiskAnalyzer:
                    fontsize=9, verticalalignment='center',
                    bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
 
-            plt.tight_layout()
+            # Marges calculées d'après le texte réel (titre, nom de la substance, légende)
+            fig.tight_layout()
 
             logger.debug(f"Graphique radar généré pour {score_data.get('cas_id', 'unknown')}")
             return fig
@@ -531,14 +1029,31 @@ class RiskAnalyzer:
         except Exception as e:
             logger.error(f"Erreur lors de la génération du graphique radar: {e}", exc_info=True)
             # Retourner une figure vide en cas d'erreur
-            fig, ax = plt.subplots(figsize=(8, 8))
+            fig = _new_figure((8, 8))
+            ax = fig.add_subplot()
             ax.text(0.5, 0.5, 'Erreur lors de la génération du graphique',
                    ha='center', va='center', fontsize=12)
             ax.axis('off')
             return fig
 
+    def generate_radar_png(self, score_data: Dict, cas_name: str = None) -> bytes:
+        """
+        Génère le graphique radar d'une substance directement en PNG
+
+        Args:
+            score_data: Dictionnaire retourné par calculate_risk_score()
+            cas_name: Nom de la substance (optionnel, pour le titre)
+
+        Returns:
+            Image PNG du graphique radar
+        """
+        fig = self.generate_radar_chart(score_data, cas_name)
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png')
+        return buffer.getvalue()
+
     def generate_comparison_radar_chart(self, scores_data_list: List[Dict],
-                                       cas_names: List[str] = None) -> plt.Figure:
+                                       cas_names: List[str] = None) -> 'matplotlib.figure.Figure':
         """
         Génère un graphique radar comparatif pour plusieurs substances
 
@@ -553,21 +1068,14 @@ class RiskAnalyzer:
             if not scores_data_list or len(scores_data_list) > 3:
                 raise ValueError("Comparaison possible pour 1 à 3 substances uniquement")
 
-            # Catégories
-            categories = [
-                'Fréquence\nModifications',
-                'Présence\nListes',
-                'Type\nChangement',
-                'Récence'
-            ]
+            # Catégories et angles (précalculés)
+            categories = _RADAR_CATEGORIES
             num_vars = len(categories)
-
-            # Calculer les angles
-            angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-            angles += angles[:1]
+            angles = _RADAR_ANGLES
 
             # Créer la figure
-            fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
+            fig = _new_figure((10, 10))
+            ax = fig.add_subplot(projection='polar')
 
             # Couleurs pour chaque substance
             colors_list = ['#d32f2f', '#1976d2', '#388e3c']
@@ -604,17 +1112,19 @@ class RiskAnalyzer:
             ax.grid(True, linestyle='--', alpha=0.7)
 
             # Titre et légende
-            plt.title("Comparaison des Scores de Risque", size=14, pad=20, weight='bold')
-            plt.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1), fontsize=10)
+            ax.set_title("Comparaison des Scores de Risque", size=14, pad=20, weight='bold')
+            ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.1), fontsize=10)
 
-            plt.tight_layout()
+            # Marges calculées d'après le texte réel (titre, légende des substances)
+            fig.tight_layout()
 
             logger.debug(f"Graphique radar comparatif généré pour {len(scores_data_list)} substances")
             return fig
 
         except Exception as e:
             logger.error(f"Erreur lors de la génération du graphique radar comparatif: {e}", exc_info=True)
-            fig, ax = plt.subplots(figsize=(10, 10))
+            fig = _new_figure((10, 10))
+            ax = fig.add_subplot()
             ax.text(0.5, 0.5, f'Erreur: {str(e)}',
                    ha='center', va='center', fontsize=12)
             ax.axis('off')
@@ -641,176 +1151,142 @@ class RiskAnalyzer:
             # Gérer le cas d'un historique vide
             if history_df.empty:
                 logger.warning("Historique vide, impossible de générer le calendrier heatmap")
-                fig = go.Figure()
-                fig.add_annotation(
+                return go.Figure(dict(layout=dict(annotations=[dict(
                     text="Aucune donnée disponible",
                     xref="paper", yref="paper",
                     x=0.5, y=0.5, showarrow=False,
                     font=dict(size=20)
-                )
-                return fig
+                )])))
 
             # Année par défaut
             if year is None:
                 year = datetime.now().year
 
-            # Copier le DataFrame pour éviter les modifications
-            df = history_df.copy()
-
-            # Convertir timestamp en datetime si nécessaire
-            if 'timestamp' in df.columns:
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
-                df['date'] = df['timestamp'].dt.date
-            else:
+            if 'timestamp' not in history_df.columns:
                 logger.error("Colonne 'timestamp' manquante dans l'historique")
                 return go.Figure()
 
-            # Appliquer les filtres
+            # Même historique et mêmes paramètres : la figure est reconstruite à partir du
+            # dictionnaire déjà calculé (nouvelle figure à chaque appel : l'appelant peut la
+            # modifier sans toucher au cache partagé entre les sessions)
+            cache_key = (year, source_list_filter, change_type_filter, self._calendar_digest(history_df))
+            cached_spec = self._calendar_cache.get(cache_key)
+            if cached_spec is not None:
+                return go.Figure(cached_spec)
+
+            # Lignes retenues : filtres éventuels et année, sans copier l'historique
+            years, days, type_codes = self._calendar_parts(history_df)
+            selected = years == year
             if source_list_filter and source_list_filter != "Toutes":
-                df = df[df['source_list'] == source_list_filter]
+                selected &= history_df['source_list'].eq(source_list_filter).to_numpy(dtype=bool, na_value=False)
 
             if change_type_filter and change_type_filter != "Tous":
-                df = df[df['change_type'] == change_type_filter]
-
-            # Filtrer par année
-            df = df[df['timestamp'].dt.year == year]
+                selected &= history_df['change_type'].eq(change_type_filter).to_numpy(dtype=bool, na_value=False)
 
-            # Agréger par date
-            daily_counts = df.groupby('date').size().reset_index(name='count')
+            # Aucun changement retenu : la grille vide ne dépend que de l'année, elle est
+            # construite une fois et réutilisée quels que soient l'historique et les filtres
+            if not selected.any():
+                cache_key = (year, 'vide')
+                cached_spec = self._calendar_cache.get(cache_key)
+                if cached_spec is not None:
+                    return go.Figure(cached_spec)
 
-            # Créer un DataFrame avec toutes les dates de l'année
+            # Toutes les dates de l'année
             start_date = datetime(year, 1, 1).date()
             end_date = datetime(year, 12, 31).date()
             all_dates = pd.date_range(start=start_date, end=end_date, freq='D')
-
-            # DataFrame complet avec toutes les dates
-            full_calendar = pd.DataFrame({'date': all_dates.date})
-            full_calendar = full_calendar.merge(daily_counts, on='date', how='left')
-            full_calendar['count'] = full_calendar['count'].fillna(0).astype(int)
-
-            # Ajouter informations de calendrier
-            full_calendar['date_dt'] = pd.to_datetime(full_calendar['date'])
-            full_calendar['week'] = full_calendar['date_dt'].dt.isocalendar().week
-            full_calendar['weekday'] = full_calendar['date_dt'].dt.dayofweek  # 0=Lundi, 6=Dimanche
-            full_calendar['month'] = full_calendar['date_dt'].dt.month
-            full_calendar['day'] = full_calendar['date_dt'].dt.day
+            n_days = len(all_dates)
+
+            # Agréger par jour de l'année (np.bincount : pas de groupby sur des objets date),
+            # au total et pour chaque type de changement détaillé dans le tooltip
+            # (un seul bincount sur les indices type * n_days + jour)
+            day_index = days[selected]
+            type_index = type_codes[selected]
+            daily_counts = np.bincount(day_index, minlength=n_days)
+            known_type = type_index >= 0
+            by_type = np.bincount(type_index[known_type] * n_days + day_index[known_type],
+                                  minlength=len(_CALENDAR_CHANGE_TYPES) * n_days)
+            daily_by_type = dict(zip(_CALENDAR_CHANGE_TYPES, by_type.reshape(-1, n_days)))
+
+            # Semaine ISO et jour de la semaine de chaque date de l'année (0=Lundi, 6=Dimanche)
+            iso_weeks = all_dates.isocalendar().week.to_numpy(dtype=np.int64)
+            weekdays = all_dates.dayofweek.to_numpy()
 
             # Préparer les données pour le heatmap
             # Format: 7 lignes (jours de la semaine) x 53 colonnes (semaines)
-            weeks = sorted(full_calendar['week'].unique())
-            z_data = []
-            hover_data = []
-
-            weekday_names = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
-
-            for weekday in range(7):
-                week_counts = []
-                week_hovers = []
-                for week in weeks:
-                    day_data = full_calendar[(full_calendar['week'] == week) &
-                                             (full_calendar['weekday'] == weekday)]
-                    if not day_data.empty:
-                        count = day_data.iloc[0]['count']
-                        date = day_data.iloc[0]['date']
-                        week_counts.append(count)
-
-                        # Détails pour le tooltip
-                        if count > 0:
-                            day_changes = df[df['date'] == date]
-                            insertions = len(day_changes[day_changes['change_type'] == 'insertion'])
-                            deletions = len(day_changes[day_changes['change_type'] == 'suppression'])
-                            modifications = len(day_changes[day_changes['change_type'] == 'modification'])
-
-                            hover_text = f"<b>{date}</b><br>"
-                            hover_text += f"Total: {count} changement{'s' if count > 1 else ''}<br>"
-                            hover_text += f"Insertions: {insertions}<br>"
-                            hover_text += f"Suppressions: {deletions}<br>"
-                            hover_text += f"Modifications: {modifications}"
-                        else:
-                            hover_text = f"<b>{date}</b><br>Aucun changement"
-
-                        week_hovers.append(hover_text)
-                    else:
-                        week_counts.append(0)
-                        week_hovers.append("")
-
-                z_data.append(week_counts)
-                hover_data.append(week_hovers)
+            weeks = np.unique(iso_weeks)
+            columns = np.searchsorted(weeks, iso_weeks)
+
+            # Jour de l'année affiché dans chaque cellule, par affectation indexée ; si deux dates
+            # tombent dans la même cellule (semaines ISO à cheval sur deux années), la première
+            # est retenue (np.unique renvoie la première occurrence de chaque cellule)
+            cells, first_days = np.unique(weekdays * len(weeks) + columns, return_index=True)
+            cell_day = np.full((7, len(weeks)), -1, dtype=np.intp)
+            cell_day.flat[cells] = first_days
+            filled = cell_day >= 0
+            shown_days = cell_day[filled]
+
+            # Matrice des comptes ; les cellules sans date de l'année (semaines ISO à cheval)
+            # restent vides (None) et n'affichent pas de tooltip (hoverongaps=False)
+            z_matrix = np.full((7, len(weeks)), None, dtype=object)
+            z_matrix[filled] = daily_counts[shown_days].tolist()
+            z_data = z_matrix.tolist()
+
+            # Détails pour le tooltip, formatés côté navigateur par le hovertemplate :
+            # seules la date et les comptes par type sont transmis (customdata)
+            custom_matrix = np.full((7, len(weeks), 4), None, dtype=object)
+            custom_matrix[filled, 0] = np.datetime_as_string(all_dates.to_numpy()[shown_days], unit='D')
+            for position, change_type in enumerate(_CALENDAR_CHANGE_TYPES, start=1):
+                custom_matrix[filled, position] = daily_by_type[change_type][shown_days].tolist()
+            custom_data = custom_matrix.tolist()
 
             # Définir le gradient de couleur
-            max_count = full_calendar['count'].max()
+            max_count = daily_counts.max()
             if max_count == 0:
                 max_count = 1  # Éviter division par zéro
 
-            # Colorscale personnalisée (blanc → vert clair → vert foncé → rouge)
-            colorscale = [
-                [0, '#ebedf0'],      # Blanc (0 changements)
-                [0.2, '#c6e48b'],    # Vert très clair
-                [0.4, '#7bc96f'],    # Vert clair
-                [0.6, '#239a3b'],    # Vert moyen
-                [0.8, '#196127'],    # Vert foncé
-                [1.0, '#c41e3a']     # Rouge (très actif)
-            ]
-
-            # Créer le heatmap
-            fig = go.Figure(data=go.Heatmap(
-                z=z_data,
-                x=[f"S{w}" for w in weeks],
-                y=weekday_names,
-                colorscale=colorscale,
-                hovertemplate='%{text}<extra></extra>',
-                text=hover_data,
-                showscale=True,
-                colorbar=dict(
-                    title="Changements",
-                    titleside="right",
-                    tickmode="linear",
-                    tick0=0,
-                    dtick=max(1, max_count // 5)
-                )
-            ))
-
-            # Mise en page
-            fig.update_layout(
-                title=dict(
-                    text=f"📅 Calendrier des Changements - {year}",
-                    x=0.5,
-                    xanchor='center',
-                    font=dict(size=20, weight='bold')
-                ),
-                xaxis=dict(
-                    title="Semaines",
-                    side="bottom",
-                    tickangle=0,
-                    showgrid=False
-                ),
-                yaxis=dict(
-                    title="",
-                    showgrid=False,
-                    autorange="reversed"  # Lundi en haut
-                ),
-                height=400,
-                plot_bgcolor='white',
-                hoverlabel=dict(
-                    bgcolor="white",
-                    font_size=12,
-                    font_family="Arial"
-                )
+            # Figure construite d'un bloc à partir d'un dictionnaire : une seule validation,
+            # au lieu de go.Heatmap(...) puis fig.update_layout(...)
+            spec = dict(
+                data=[dict(
+                    type='heatmap',
+                    z=z_data,
+                    zmin=0,
+                    x=[f"S{w}" for w in weeks],
+                    y=_WEEKDAY_NAMES,
+                    colorscale=_CALENDAR_COLORSCALE,
+                    customdata=custom_data,
+                    hovertemplate=_CALENDAR_HOVERTEMPLATE,
+                    hoverongaps=False,
+                    showscale=True,
+                    colorbar={**_CALENDAR_COLORBAR, 'dtick': max(1, max_count // 5)}
+                )],
+                layout={
+                    **_CALENDAR_LAYOUT,
+                    'title': dict(
+                        text=f"📅 Calendrier des Changements - {year}",
+                        x=0.5,
+                        xanchor='center',
+                        font=dict(size=20, weight='bold')
+                    )
+                }
             )
+            fig = go.Figure(spec)
 
-            logger.info(f"Calendrier heatmap généré pour l'année {year} avec {len(df)} changements")
+            # Éviction sous verrou : l'analyseur est partagé entre les sessions
+            with self._calendar_lock:
+                if len(self._calendar_cache) >= 16:
+                    self._calendar_cache.pop(next(iter(self._calendar_cache)))
+                self._calendar_cache[cache_key] = spec
+
+            logger.info(f"Calendrier heatmap généré pour l'année {year} avec {len(day_index)} changements")
             return fig
 
         except Exception as e:
             logger.error(f"Erreur lors de la génération du calendrier heatmap: {e}", exc_info=True)
-            fig = go.Figure()
-            fig.add_annotation(
-                text=f"Erreur: {str(e)}",
-                xref="paper", yref="paper",
-                x=0.5, y=0.5, showarrow=False,
-                font=dict(size=16, color='red')
-            )
-            return fig
+            return go.Figure(dict(layout=dict(annotations=[
+                {**_CALENDAR_ERROR_ANNOTATION, 'text': f"Erreur: {str(e)}"}
+            ])))
 
     def generate_substance_timeline(self,
                                      cas_id: str,
@@ -1178,9 +1654,8 @@ class RiskAnalyzer:
             substance_scores = {}
             if history_df is not None and not history_df.empty:
                 unique_cas_ids = df['cas_id'].unique()
-                for cas_id in unique_cas_ids:
-                    score_data = self.calculate_risk_score(cas_id, df, history_df)
-                    substance_scores[cas_id] = score_data['total_score']
+                scores_df = self.calculate_scores_for_watchlist(list(unique_cas_ids), df, history_df)
+                substance_scores = dict(zip(unique_cas_ids, scores_df['total_score']))
             else:
                 # Scores par défaut si pas d'historique
                 for cas_id in df['cas_id'].unique():
@@ -1553,7 +2028,7 @@ class RiskAnalyzer:
                 metrics['modifications'] = len(history_df[history_df['change_type'] == 'modification'])
 
                 # Changements récents (7 derniers jours)
-                history_df['timestamp'] = pd.to_datetime(history_df['timestamp'])
+                history_df['timestamp'] = self._ensure_datetime(history_df)
                 now = datetime.now()
                 seven_days_ago = now - timedelta(days=7)
                 recent_changes = history_df[history_df['timestamp'] >= seven_days_ago]
@@ -1589,33 +2064,35 @@ class RiskAnalyzer:
 
             # Scores de risque
             if not aggregated_df.empty and not history_df.empty:
-                scores = []
+                # Un seul calcul groupé pour toutes les substances (au lieu de deux par substance)
+                scores_df = self.calculate_scores_for_watchlist(
+                    list(aggregated_df['cas_id'].unique()), aggregated_df, history_df
+                )
+                scores = scores_df['total_score'].tolist()
                 risk_distribution = {'Faible': 0, 'Moyen': 0, 'Élevé': 0, 'Critique': 0}
-
-                for cas_id in aggregated_df['cas_id'].unique():
-                    score_data = self.calculate_risk_score(cas_id, aggregated_df, history_df)
-                    scores.append(score_data['total_score'])
-                    risk_distribution[score_data['level']] += 1
+                for level in scores_df['level']:
+                    risk_distribution[level] += 1
 
                 metrics['avg_risk_score'] = sum(scores) / len(scores) if scores else 0
                 metrics['max_risk_score'] = max(scores) if scores else 0
                 metrics['risk_distribution'] = risk_distribution
 
                 # Top 5 substances critiques
-                top_substances = []
-                for cas_id in aggregated_df['cas_id'].unique():
-                    score_data = self.calculate_risk_score(cas_id, aggregated_df, history_df)
-                    substance_data = aggregated_df[aggregated_df['cas_id'] == cas_id].iloc[0]
-                    top_substances.append({
+                cas_names = aggregated_df.drop_duplicates('cas_id').set_index('cas_id')['cas_name']
+                top_scores = scores_df.nlargest(5, 'total_score')
+                metrics['top_critical'] = [
+                    {
                         'cas_id': cas_id,
-                        'cas_name': substance_data['cas_name'],
-                        'score': score_data['total_score'],
-                        'level': score_data['level'],
-                        'badge': score_data['badge']
-                    })
-
-                top_substances = sorted(top_substances, key=lambda x: x['score'], reverse=True)[:5]
-                metrics['top_critical'] = top_substances
+                        'cas_name': cas_names[cas_id],
+                        'score': score,
+                        'level': level,
+                        'badge': badge
+                    }
+                    for cas_id, score, level, badge in zip(
+                        top_scores['cas_id'], top_scores['total_score'],
+                        top_scores['level'], top_scores['badge']
+                    )
+                ]
 
             else:
                 metrics['avg_risk_score'] = 0
@@ -1772,10 +2249,9 @@ class RiskAnalyzer:
 
             # Calculer les scores de risque pour chaque substance
             df = aggregated_df.copy()
-            df['risk_score'] = df.apply(
-                lambda row: self.calculate_risk_score(row['cas_id'], aggregated_df, history_df)['total_score'],
-                axis=1
-            )
+            unique_cas_ids = df['cas_id'].unique()
+            scores_df = self.calculate_scores_for_watchlist(list(unique_cas_ids), aggregated_df, history_df)
+            df['risk_score'] = df['cas_id'].map(dict(zip(unique_cas_ids, scores_df['total_score'])))
 
             # Déterminer le niveau de risque
             def get_risk_level(score):
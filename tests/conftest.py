@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Les modules backend sont importés depuis la racine du projet
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
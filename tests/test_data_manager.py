@@ -0,0 +1,74 @@
+"""
+Tests de DataManager : une agrégation relue depuis le fichier Excel doit être reconnue
+comme identique (pas de réécriture ni de changement détecté à chaque mise à jour)
+"""
+
+import pandas as pd
+import pytest
+import yaml
+
+from backend.data_manager import DataManager
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    input_folder = tmp_path / "data" / "input"
+    input_folder.mkdir(parents=True)
+    pd.DataFrame({
+        'CAS number': ['50-00-0', '64-17-5', '-', None],
+        'Substance name': ['Formaldéhyde', 'Éthanol', 'Mélange', 'Inconnu'],
+        'Description': ['desc a', None, 'desc c', 'desc d'],
+    }).to_excel(input_folder / "lista_full-2025.xlsx", index=False)
+    pd.DataFrame({
+        'CAS number': ['50-00-0', '71-43-2'],
+        'Substance name': ['Formaldéhyde', 'Benzène'],
+        'Entry number': [12, 7],
+    }).to_excel(input_folder / "listb_full-2025.xlsx", index=False)
+
+    config = {
+        'general': {'data_folder': str(tmp_path / "data"), 'archive_folder': str(tmp_path / "archives"),
+                    'archive_old_files': False},
+        'source_files': {'cas_source': 'cas_source.xlsx', 'lists': [
+            {'name': 'lista', 'file_pattern': 'lista_full-*.xlsx', 'enabled': True},
+            {'name': 'listb', 'file_pattern': 'listb_full-*.xlsx', 'enabled': True},
+        ]},
+        'columns': {
+            'common': {'cas_id': 'CAS number', 'cas_name': 'Substance name'},
+            'lista': {'description': 'Description'},
+            'listb': {'entry_number': 'Entry number'},
+        },
+        'dtypes': {'cas_id': 'string[pyarrow]', 'change_type': 'string[pyarrow]'},
+        'output_files': {'aggregated_data': str(tmp_path / "data" / "aggregated_data.xlsx")},
+    }
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding='utf-8')
+    return DataManager(str(config_path))
+
+
+def test_aggregate_round_trip_is_unchanged(data_manager):
+    aggregated = data_manager.aggregate_all_data()
+    assert str(aggregated['cas_id'].dtype) == 'string'
+    assert isinstance(aggregated['source_list'].dtype, pd.CategoricalDtype)
+    assert data_manager.save_aggregated_data(aggregated) is True
+
+    # Le fichier relu (colonnes object) doit être égal à l'agrégation typée
+    reloaded = data_manager.load_aggregated_data()
+    assert data_manager._dataframes_are_equal(reloaded, aggregated)
+
+    # Nouvelle agrégation complète des mêmes sources (sans l'empreinte des fichiers) :
+    # aucune réécriture, timestamps conservés
+    data_manager.aggregate_stamp_file.unlink()
+    again = data_manager.aggregate_all_data()
+    assert not data_manager.is_reused_aggregate(again)
+    assert data_manager.save_aggregated_data(again) is False
+    assert again['updated_at'].tolist() == aggregated['updated_at'].tolist()
+
+
+def test_dataframes_are_equal_ignores_dtypes(data_manager):
+    typed = pd.DataFrame({
+        'cas_id': pd.Series(['50-00-0', None], dtype='string[pyarrow]'),
+        'source_list': pd.Categorical(['lista', 'listb']),
+    })
+    as_read = pd.DataFrame({'cas_id': ['50-00-0', None], 'source_list': ['lista', 'listb']})
+    assert data_manager._dataframes_are_equal(typed, as_read)
+    assert not data_manager._dataframes_are_equal(typed, as_read.assign(source_list=['lista', 'lista']))
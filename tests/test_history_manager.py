@@ -0,0 +1,72 @@
+"""
+Tests de HistoryManager : migration de l'ancien historique Excel vers SQLite
+et ajout de lignes portant de nouvelles colonnes
+"""
+
+import pandas as pd
+import pytest
+import yaml
+
+from backend.history_manager import HistoryManager
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    data_folder = tmp_path / "data"
+    data_folder.mkdir()
+    pd.DataFrame({
+        'change_type': ['insertion', 'deletion'],
+        'source_list': ['lista', 'listb'],
+        'timestamp': ['2024-06-01T08:00:00', '2024-06-02T09:30:00'],
+        'cas_id': ['50-00-0', None],
+        'cas_name': ['Formaldéhyde', 'Inconnu'],
+        'new_values': ["{'cas_id': '50-00-0'}", None],
+        'old_values': [None, "{'cas_id': None}"],
+    }).to_excel(data_folder / "change_history.xlsx", index=False)
+
+    config = {
+        'general': {'archive_folder': str(tmp_path / "archives"), 'archive_old_files': False},
+        'dtypes': {'cas_id': 'string[pyarrow]', 'change_type': 'string[pyarrow]'},
+        'output_files': {
+            'history_database': str(data_folder / "history.db"),
+            'change_history': str(data_folder / "change_history.xlsx"),
+            'summary_history': str(data_folder / "summary_history.xlsx"),
+        },
+    }
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding='utf-8')
+    return str(path)
+
+
+def test_migrate_legacy_history_then_append_new_column(config_path):
+    manager = HistoryManager(config_path)
+    migrated = manager.load_history()
+    assert len(migrated) == 2
+    assert 'modified_fields' not in migrated.columns
+
+    # Ligne construite comme par ChangeDetector (colonnes object, dictionnaires)
+    # avec une colonne absente de l'ancien fichier : ALTER TABLE
+    manager.save_changes(pd.DataFrame([{
+        'change_type': 'modification',
+        'source_list': 'lista',
+        'timestamp': '2024-06-03T10:00:00',
+        'cas_id': '64-17-5',
+        'cas_name': 'Éthanol',
+        'modified_fields': 'Description',
+        'new_values': {'cas_id': '64-17-5', 'Description': 'nouvelle'},
+        'old_values': {'cas_id': '64-17-5', 'Description': 'ancienne'},
+    }]))
+
+    # Une nouvelle instance ne doit pas réimporter l'ancien fichier
+    history = HistoryManager(config_path).load_history()
+    assert len(history) == 3
+    assert str(history['cas_id'].dtype) == 'string'
+    assert str(history['change_type'].dtype) == 'string'
+    assert history['cas_id'].isna().tolist() == [False, True, False]
+    assert history['modified_fields'].tolist()[:2] == [None, None]
+    assert history['modified_fields'].iloc[2] == 'Description'
+    assert history['new_values'].iloc[2] == str({'cas_id': '64-17-5', 'Description': 'nouvelle'})
+
+    by_cas = manager.get_changes_by_cas('64-17-5')
+    assert by_cas['change_type'].tolist() == ['modification']
+    assert manager.get_recent_changes(limit=1)['cas_id'].tolist() == ['64-17-5']
@@ -0,0 +1,73 @@
+"""
+Tests du calcul des scores de risque : le calcul groupé (watchlist, dashboard, heatmap)
+doit donner les mêmes scores que calculate_risk_score substance par substance
+"""
+
+import pandas as pd
+import pytest
+
+from backend.risk_analyzer import RiskAnalyzer
+
+SCORE_KEYS = ['total_score', 'level', 'badge', 'components', 'metadata']
+
+
+@pytest.fixture
+def aggregated_df():
+    return pd.DataFrame({
+        'cas_id': ['50-00-0', '50-00-0', '64-17-5', '71-43-2'],
+        'cas_name': ['Formaldéhyde', 'Formaldéhyde', 'Éthanol', 'Benzène'],
+        'source_list': ['testa', 'testb', 'testa', 'testc'],
+        'created_at': ['2024-01-10 09:00:00'] * 4,
+    })
+
+
+@pytest.fixture
+def history_df():
+    # Mise à jour du 2024-06-01 : la même substance change sur plusieurs listes
+    # avec un timestamp identique (timestamps ex aequo)
+    return pd.DataFrame({
+        'cas_id': ['50-00-0', '50-00-0', '50-00-0', '64-17-5', '64-17-5', '64-17-5', '71-43-2'],
+        'change_type': ['insertion', 'modification', 'suppression',
+                        'insertion', 'insertion', 'modification', 'insertion'],
+        'source_list': ['testa', 'testa', 'testb', 'testa', 'testa', 'testb', 'testc'],
+        'timestamp': ['2024-01-10 09:00:00', '2024-06-01 08:00:00', '2024-06-01 08:00:00',
+                      '2024-01-10 09:00:00', '2024-06-01 08:00:00', '2024-06-01 08:00:00',
+                      None],
+    })
+
+
+@pytest.mark.parametrize('parse_timestamps', [False, True])
+def test_batch_scores_match_single_scores_on_tied_timestamps(aggregated_df, history_df, parse_timestamps):
+    if parse_timestamps:
+        history_df = history_df.assign(timestamp=pd.to_datetime(history_df['timestamp']))
+    analyzer = RiskAnalyzer()
+    cas_ids = ['50-00-0', '64-17-5', '71-43-2']
+
+    batch = analyzer.calculate_scores_for_watchlist(cas_ids, aggregated_df, history_df)
+    for row in batch.to_dict('records'):
+        single = analyzer.calculate_risk_score(row['cas_id'], aggregated_df, history_df)
+        for key in SCORE_KEYS:
+            assert row[key] == single[key], (row['cas_id'], key)
+
+
+def test_latest_change_keeps_first_row_among_tied_timestamps(aggregated_df, history_df):
+    analyzer = RiskAnalyzer()
+    batch = analyzer.calculate_scores_for_watchlist(['50-00-0', '64-17-5'], aggregated_df, history_df)
+    recent = {row['cas_id']: row['components']['recent_change_type'] for row in batch.to_dict('records')}
+    # Première ligne parmi les changements du 2024-06-01 : modification (60) puis insertion (30)
+    assert recent['50-00-0'] == 60.0
+    assert recent['64-17-5'] == 30.0
+
+
+def test_calendar_heatmap_cache_returns_independent_figures(history_df):
+    analyzer = RiskAnalyzer()
+    first = analyzer.generate_calendar_heatmap(history_df, year=2024)
+    expected = first.to_json()
+
+    # Modifier la figure reçue ne doit pas altérer le calendrier mis en cache
+    first.update_layout(title_text='modifié', height=100)
+    first.update_traces(zmin=5, customdata=None)
+
+    second = analyzer.generate_calendar_heatmap(history_df, year=2024)
+    assert second is not first
+    assert second.to_json() == expected